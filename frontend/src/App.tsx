@@ -15,6 +15,8 @@ export interface ServiceStatus {
   pid: number | null
   port: number | null
   depends_on: string[]
+  health_checked_at: number | null
+  health_changed_at: number | null
 }
 
 const tabs = [
@@ -29,6 +31,7 @@ export default function App() {
   const [services, setServices] = useState<ServiceStatus[]>([])
   const [activeTab, setActiveTab] = useState<TabId>('dashboard')
   const [error, setError] = useState<string | null>(null)
+  const [events, setEvents] = useState<EventSource | null>(null)
 
   const fetchStatus = useCallback(async () => {
     try {
@@ -42,11 +45,18 @@ export default function App() {
     }
   }, [])
 
+  // One Server-Sent Events stream pushes status, GPU and log updates;
+  // EventSource reconnects on its own after errors.
   useEffect(() => {
-    fetchStatus()
-    const id = setInterval(fetchStatus, 10000)
-    return () => clearInterval(id)
-  }, [fetchStatus])
+    const source = new EventSource('/api/events')
+    source.addEventListener('status', (e) => {
+      setServices(JSON.parse((e as MessageEvent).data))
+      setError(null)
+    })
+    source.onerror = () => setError('Backend unreachable')
+    setEvents(source)
+    return () => source.close()
+  }, [])
 
   const allRunning = services.length > 0 && services.every(s => s.health === 'running')
   const anyStarting = services.some(s => s.health === 'starting')
@@ -107,10 +117,10 @@ export default function App() {
                 <StatusPanel services={services} onRefresh={fetchStatus} />
               </div>
               <div className="shrink-0">
-                <GpuMetrics />
+                <GpuMetrics events={events} />
               </div>
               <div className="flex-1 min-h-0">
-                <LogViewer services={services} />
+                <LogViewer services={services} events={events} />
               </div>
             </div>
           )}
@@ -7,20 +7,15 @@ interface GpuInfo {
   utilization_percent: number | null
 }
 
-export default function GpuMetrics() {
+export default function GpuMetrics({ events }: { events: EventSource | null }) {
   const [gpu, setGpu] = useState<GpuInfo | null>(null)
 
   useEffect(() => {
-    const fetchGpu = async () => {
-      try {
-        const res = await fetch('/api/gpu')
-        if (res.ok) setGpu(await res.json())
-      } catch { /* ignore */ }
-    }
-    fetchGpu()
-    const id = setInterval(fetchGpu, 10000)
-    return () => clearInterval(id)
-  }, [])
+    if (!events) return
+    const onGpu = (e: Event) => setGpu(JSON.parse((e as MessageEvent).data))
+    events.addEventListener('gpu', onGpu)
+    return () => events.removeEventListener('gpu', onGpu)
+  }, [events])
 
   if (!gpu || !gpu.name) return null
 
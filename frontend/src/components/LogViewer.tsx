@@ -30,7 +30,9 @@ function convertTimestamps(text: string, serverOffsetMin: number): string {
   return result
 }
 
-export default function LogViewer({ services }: { services: ServiceStatus[] }) {
+const MAX_LINES = 1000
+
+export default function LogViewer({ services, events }: { services: ServiceStatus[]; events: EventSource | null }) {
   const [activeService, setActiveService] = useState<string>(services[0]?.id || '')
   const [logs, setLogs] = useState('')
   const [autoScroll, setAutoScroll] = useState(true)
@@ -43,27 +45,40 @@ export default function LogViewer({ services }: { services: ServiceStatus[] }) {
     }
   }, [services, activeService])
 
+  // History comes from /api/logs (again after each reconnect, to fill any
+  // gap); new lines are appended as "log" events arrive.
   useEffect(() => {
     if (!activeService) return
+    const convert = (raw: string) =>
+      utcOffsetRef.current !== null ? convertTimestamps(raw, utcOffsetRef.current) : raw
     const fetchLogs = async () => {
       try {
         const res = await fetch(`/api/logs/${activeService}?lines=200`)
         if (res.ok) {
           const data = await res.json()
           utcOffsetRef.current = data.utc_offset_minutes ?? null
-          const raw = data.logs || ''
-          setLogs(
-            utcOffsetRef.current !== null
-              ? convertTimestamps(raw, utcOffsetRef.current)
-              : raw
-          )
+          setLogs(convert(data.logs || ''))
         }
       } catch { /* ignore */ }
     }
+    const onLog = (e: Event) => {
+      const data = JSON.parse((e as MessageEvent).data)
+      if (data.service !== activeService) return
+      const added = convert(data.lines.join('\n') + '\n')
+      setLogs(prev => {
+        const lines = (prev + added).split('\n')
+        return lines.length > MAX_LINES ? lines.slice(-MAX_LINES).join('\n') : prev + added
+      })
+    }
     fetchLogs()
-    const id = setInterval(fetchLogs, 5000)
-    return () => clearInterval(id)
-  }, [activeService])
+    if (!events) return
+    events.addEventListener('log', onLog)
+    events.addEventListener('open', fetchLogs)
+    return () => {
+      events.removeEventListener('log', onLog)
+      events.removeEventListener('open', fetchLogs)
+    }
+  }, [activeService, events])
 
   useEffect(() => {
     if (autoScroll && logRef.current) {
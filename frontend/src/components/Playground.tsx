@@ -44,6 +44,15 @@ function genId(): string {
   return Date.now().toString(36) + Math.random().toString(36).slice(2, 10)
 }
 
+function blobToBase64(blob: Blob): Promise<string> {
+  return new Promise((resolve, reject) => {
+    const reader = new FileReader()
+    reader.onload = () => resolve((reader.result as string).split(',')[1])
+    reader.onerror = () => reject(reader.error)
+    reader.readAsDataURL(blob)
+  })
+}
+
 function base64ToBlobUrl(b64: string): string {
   const binary = atob(b64)
   const bytes = new Uint8Array(binary.length)
@@ -116,27 +125,31 @@ export default function Playground() {
           ? { type: 'preset', preset_id: presetId }
           : { type: 'base64', data: uploadedBase64 },
       llm: { temperature, top_p: topP, repetition_penalty: repPenalty },
-      output: { format: 'base64' },
+      output: { format: 'wav' },
     }
 
     try {
       const res = await fetch('/api/tts', {
         method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
+        headers: { 'Content-Type': 'application/json', Accept: 'audio/wav' },
         body: JSON.stringify(body),
       })
-      const data = await res.json()
       if (!res.ok) {
+        const data = await res.json().catch(() => ({}))
         setError(data.detail || `Error ${res.status}`)
       } else {
         if (result?.audioUrl) URL.revokeObjectURL(result.audioUrl)
 
-        const url = base64ToBlobUrl(data.audio)
+        // Raw WAV body; metadata arrives in X-TTS-* headers
+        const blob = await res.blob()
+        const tokenCount = Number(res.headers.get('X-TTS-Token-Count') || 0)
+        const timings: TTSTimings = JSON.parse(res.headers.get('X-TTS-Timings') || '{}')
+        const normalized = res.headers.get('X-TTS-Normalized-Text')
         setResult({
-          audioUrl: url,
-          tokenCount: data.token_count,
-          timings: data.timings,
-          normalizedText: data.normalized_text,
+          audioUrl: URL.createObjectURL(blob),
+          tokenCount,
+          timings,
+          normalizedText: normalized !== null ? decodeURIComponent(normalized) : undefined,
         })
 
         // Add to history
@@ -146,9 +159,9 @@ export default function Playground() {
           preset: refMode === 'preset' ? presetId : uploadedFilename,
           temperature,
           topP,
-          tokenCount: data.token_count,
-          totalSec: data.timings.total_sec,
-          audioBase64: data.audio,
+          tokenCount,
+          totalSec: timings.total_sec,
+          audioBase64: await blobToBase64(blob),
           timestamp: Date.now(),
         }
         const updated = [entry, ...history].slice(0, MAX_HISTORY)
@@ -5,23 +5,45 @@ Manages vLLM + MioTTS API processes, reference audio presets, model switching,
 and proxies the TTS playground. Reads service definitions from services.yaml.
 """
 
+import argparse
 import asyncio
+import base64
+import hashlib
+import io
+import ipaddress
 import json
 import logging
+import math
+import multiprocessing
 import os
+import re
+import shutil
 import signal
+import sqlite3
+import struct
 import subprocess
-from collections import deque
+import sys
+import threading
+import time
+import uuid
+import wave
+from array import array
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from contextlib import asynccontextmanager
 from datetime import datetime, timezone
 from pathlib import Path
+from typing import NamedTuple
+from urllib.parse import quote
 
 import httpx
 import uvicorn
 import yaml
-from fastapi import FastAPI, File, HTTPException, Request, UploadFile
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi import FastAPI, File, HTTPException, Request, UploadFile, WebSocket, WebSocketDisconnect
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
+from starlette.requests import HTTPConnection
 from pydantic import BaseModel
 
 logger = logging.getLogger("miotts-cockpit")
@@ -31,6 +53,8 @@ LOG_DIR = BASE_DIR / "logs"
 CONFIG_PATH = BASE_DIR / "services.yaml"
 STATE_PATH = BASE_DIR / "state.json"
 FRONTEND_DIR = BASE_DIR / "frontend" / "dist"
+CACHE_DIR = BASE_DIR / "cache"
+JOBS_DIR = BASE_DIR / "jobs"
 
 HEALTH_CHECK_PATTERNS = [
     '"GET /health HTTP',
@@ -67,11 +91,18 @@ class ManagedService:
         self.port = config.get("port")
         self.depends_on: list[str] = config.get("depends_on", [])
         self.startup_timeout = config.get("startup_timeout", 120)
+        # Health probes start every startup_poll_min seconds and back off to
+        # startup_poll_interval; a ready_log_pattern match probes immediately.
         self.startup_poll_interval = config.get("startup_poll_interval", 5)
+        self.startup_poll_min = min(config.get("startup_poll_min", 0.25), self.startup_poll_interval)
+        pattern = config.get("ready_log_pattern")
+        self.ready_log_pattern = re.compile(pattern) if pattern else None
         self.process: asyncio.subprocess.Process | None = None
         self.log_path = LOG_DIR / f"{service_id}.log"
         self._log_file = None
+        self._log_offset = 0  # Log size when the current process was started
         self._state = "stopped"  # stopped, starting, running, error
+        self.on_state_change = None  # Called with no arguments when state is set to a new value
 
     @property
     def state(self) -> str:
@@ -83,7 +114,10 @@ class ManagedService:
 
     @state.setter
     def state(self, value: str):
+        changed = value != self._state
         self._state = value
+        if changed and self.on_state_change:
+            self.on_state_change()
 
     def _build_env(self) -> dict[str, str]:
         env = os.environ.copy()
@@ -97,6 +131,7 @@ class ManagedService:
 
         LOG_DIR.mkdir(parents=True, exist_ok=True)
         self._log_file = open(self.log_path, "a")
+        self._log_offset = self._log_file.tell()
         self.state = "starting"
 
         self.process = await asyncio.create_subprocess_exec(
@@ -109,31 +144,80 @@ class ManagedService:
         )
         logger.info("Started %s (PID %d)", self.name, self.process.pid)
 
+    def read_log_lines(self, offset: int | None = None) -> tuple[list[str], int]:
+        """Complete log lines written since byte ``offset``, and the new offset.
+
+        ``offset=None`` starts at the current end of the log. A log that has
+        shrunk below ``offset`` (truncated) is read from the beginning.
+        """
+        try:
+            with open(self.log_path, "rb") as f:
+                size = f.seek(0, os.SEEK_END)
+                if offset is None:
+                    return [], size
+                if size < offset:
+                    offset = 0
+                f.seek(offset)
+                data = f.read(size - offset)
+        except FileNotFoundError:
+            return [], 0
+        end = data.rfind(b"\n") + 1  # Leave a partial last line for next time
+        return data[:end].decode(errors="replace").splitlines(), offset + end
+
+    async def _watch_log(self, ready: asyncio.Event):
+        """Set ``ready`` whenever a new log line matches ready_log_pattern."""
+        offset = self._log_offset
+        while True:
+            lines, offset = self.read_log_lines(offset)
+            if any(self.ready_log_pattern.search(line) for line in lines):
+                ready.set()
+            await asyncio.sleep(0.2)
+
     async def wait_healthy(self) -> bool:
-        if not self.health_url:
+        if not self.health_url and not self.ready_log_pattern:
             await asyncio.sleep(2)
             self.state = "running"
             return True
 
-        elapsed = 0
-        async with httpx.AsyncClient(timeout=3.0) as client:
-            while elapsed < self.startup_timeout:
-                if self.process and self.process.returncode is not None:
+        deadline = time.monotonic() + self.startup_timeout
+        interval = self.startup_poll_min
+        ready = asyncio.Event()
+        watcher = asyncio.create_task(self._watch_log(ready)) if self.ready_log_pattern else None
+        try:
+            async with httpx.AsyncClient(timeout=3.0) as client:
+                while (remaining := deadline - time.monotonic()) > 0:
+                    if self.process and self.process.returncode is not None:
+                        self.state = "error"
+                        return False
+                    if not self.health_url:
+                        # Readiness comes from the log alone
+                        if ready.is_set():
+                            break
+                    else:
+                        try:
+                            resp = await client.get(self.health_url)
+                            if resp.status_code == 200:
+                                break
+                        except Exception:
+                            pass
+                    try:
+                        await asyncio.wait_for(ready.wait(), timeout=min(interval, remaining))
+                        # The log says it is up: probe right away, then quickly again
+                        if self.health_url:
+                            ready.clear()
+                        interval = self.startup_poll_min
+                    except asyncio.TimeoutError:
+                        interval = min(interval * 1.5, self.startup_poll_interval)
+                else:
                     self.state = "error"
                     return False
-                try:
-                    resp = await client.get(self.health_url)
-                    if resp.status_code == 200:
-                        self.state = "running"
-                        logger.info("%s is healthy", self.name)
-                        return True
-                except Exception:
-                    pass
-                await asyncio.sleep(self.startup_poll_interval)
-                elapsed += self.startup_poll_interval
+        finally:
+            if watcher:
+                watcher.cancel()
 
-        self.state = "error"
-        return False
+        self.state = "running"
+        logger.info("%s is healthy", self.name)
+        return True
 
     async def stop(self):
         if self.process is None or self.process.returncode is not None:
@@ -159,8 +243,8 @@ class ManagedService:
             self._log_file = None
         logger.info("Stopped %s", self.name)
 
-    async def check_health(self) -> str:
-        """Quick health check without waiting."""
+    async def check_health(self, client: httpx.AsyncClient, timeout: float = 2.0) -> str:
+        """Quick health check without waiting; the probe is bounded by ``timeout``."""
         if self.process is None or self.process.returncode is not None:
             return "stopped"
         if self._state == "starting":
@@ -168,11 +252,10 @@ class ManagedService:
         if not self.health_url:
             return "running"
         try:
-            async with httpx.AsyncClient(timeout=2.0) as client:
-                resp = await client.get(self.health_url)
-                if resp.status_code == 200:
-                    return "running"
-                return "unhealthy"
+            resp = await asyncio.wait_for(client.get(self.health_url), timeout)
+            if resp.status_code == 200:
+                return "running"
+            return "unhealthy"
         except Exception:
             return "unhealthy"
 
@@ -204,11 +287,21 @@ class ManagedService:
 
 
 class ServiceManager:
+    STATUS_PROBE_TIMEOUT = 2.0
+
     def __init__(self, config: dict):
         self.services: dict[str, ManagedService] = {}
         self._starting = False
+        self._client: httpx.AsyncClient | None = None
+        self.monitor_interval = float(config.get("health_monitor", {}).get("interval", 5))
+        self._health: dict[str, dict] = {}
+        self._monitor_task: asyncio.Task | None = None
+        self._published_status: list[dict] | None = None
+        self.on_status_change = None  # Called with get_status() whenever it changes
+        self._wake = asyncio.Event()
         for sid, sconf in config.get("services", {}).items():
             self.services[sid] = ManagedService(sid, sconf)
+            self.services[sid].on_state_change = self.refresh_soon
 
     def _start_order(self) -> list[str]:
         """Topological sort based on depends_on."""
@@ -230,21 +323,41 @@ class ServiceManager:
         return order
 
     async def start_all(self):
+        """Start every service, each as soon as its own dependencies are healthy.
+
+        Services that do not depend on each other start and health-wait
+        concurrently. If a service fails, its dependents are not started;
+        unrelated services still are, and the first failure is raised.
+        """
         if self._starting:
             raise RuntimeError("Already starting")
         self._starting = True
+        tasks: dict[str, asyncio.Task] = {}
+
+        async def bring_up(svc: ManagedService):
+            deps = [tasks[dep] for dep in svc.depends_on if dep in tasks]
+            if deps:
+                await asyncio.gather(*deps)  # Raises if a dependency failed
+            if svc.state == "running":
+                return
+            await svc.start()
+            healthy = await svc.wait_healthy()
+            if not healthy:
+                raise RuntimeError(
+                    f"{svc.name} failed to become healthy within {svc.startup_timeout}s"
+                )
+
         try:
+            # Topological order guarantees dependencies get their task first
             for sid in self._start_order():
-                svc = self.services[sid]
-                if svc.state == "running":
-                    continue
-                await svc.start()
-                healthy = await svc.wait_healthy()
-                if not healthy:
-                    raise RuntimeError(
-                        f"{svc.name} failed to become healthy within {svc.startup_timeout}s"
-                    )
+                tasks[sid] = asyncio.create_task(bring_up(self.services[sid]))
+            results = await asyncio.gather(*tasks.values(), return_exceptions=True)
+            errors = [r for r in results if isinstance(r, BaseException)]
+            if errors:
+                raise errors[0]
         finally:
+            for task in tasks.values():
+                task.cancel()
             self._starting = False
 
     async def stop_all(self):
@@ -275,15 +388,76 @@ class ServiceManager:
                 await other.stop()
         await svc.stop()
 
-    async def get_status(self) -> list[dict]:
+    async def refresh_health(self):
+        """Probe all services concurrently over one pooled client and update the snapshot."""
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=self.STATUS_PROBE_TIMEOUT)
+        services = list(self.services.values())
+        healths = await asyncio.gather(
+            *(svc.check_health(self._client, self.STATUS_PROBE_TIMEOUT) for svc in services)
+        )
+        now = time.time()
+        for svc, health in zip(services, healths):
+            previous = self._health.get(svc.id)
+            changed_at = now
+            if previous is not None:
+                if previous["health"] == health:
+                    changed_at = previous["health_changed_at"]
+                else:
+                    logger.info("%s health: %s -> %s", svc.name, previous["health"], health)
+            self._health[svc.id] = {
+                "health": health,
+                "health_checked_at": now,
+                "health_changed_at": changed_at,
+            }
+        if self.on_status_change:
+            status = self.get_status()
+            comparable = [{k: v for k, v in info.items() if k != "health_checked_at"} for info in status]
+            if comparable != self._published_status:
+                self._published_status = comparable
+                self.on_status_change(status)
+
+    async def _monitor(self):
+        while True:
+            self._wake.clear()
+            try:
+                await self.refresh_health()
+            except Exception:
+                logger.exception("Health monitor probe failed")
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.monitor_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def start_monitor(self):
+        """Probe services in the background so status reads never wait on them."""
+        self._monitor_task = asyncio.create_task(self._monitor())
+
+    def refresh_soon(self):
+        """Have the monitor probe now instead of at its next interval."""
+        self._wake.set()
+
+    def get_status(self) -> list[dict]:
+        """Current service info plus the monitor's latest health snapshot."""
         results = []
         for sid in self._start_order():
-            svc = self.services[sid]
-            info = svc.get_info()
-            info["health"] = await svc.check_health()
+            info = self.services[sid].get_info()
+            info.update(self._health.get(sid) or {
+                "health": "unknown",
+                "health_checked_at": None,
+                "health_changed_at": None,
+            })
             results.append(info)
         return results
 
+    async def aclose(self):
+        if self._monitor_task is not None:
+            self._monitor_task.cancel()
+            self._monitor_task = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
 
 # ---------------------------------------------------------------------------
 # Reference Audio Manager (MioTTS-specific)
@@ -291,15 +465,36 @@ class ServiceManager:
 
 class ReferenceAudioManager:
     ALLOWED_EXTENSIONS = {".wav", ".flac", ".ogg"}
-
-    def __init__(self, presets_dir: Path, miotts_cwd: Path):
+    # Hidden presets generated from inline base64 reference audio
+    INLINE_PREFIX = "_inline_"
+    AUDIO_MAGIC = {b"RIFF": ".wav", b"fLaC": ".flac", b"OggS": ".ogg"}
+
+    def __init__(
+        self,
+        presets_dir: Path,
+        miotts_cwd: Path,
+        max_inline_presets: int = 200,
+        max_concurrent_inline: int = 1,
+        max_pending_inline: int = 16,
+    ):
         self.presets_dir = presets_dir
         self.miotts_cwd = miotts_cwd
+        self.max_inline_presets = max_inline_presets
+        self.max_pending_inline = max_pending_inline
         self.presets_dir.mkdir(parents=True, exist_ok=True)
+        self._converting: dict[str, asyncio.Task] = {}
+        self._convert_slots = asyncio.Semaphore(max(1, max_concurrent_inline))
+        # Digests seen once; audio is only converted when it comes back
+        self._seen_inline: OrderedDict[str, None] = OrderedDict()
+        self._failed_inline: set[str] = set()
+        self.inline_hits = 0
+        self.inline_conversions = 0
 
     def list_presets(self) -> list[dict]:
         presets = []
         for p in sorted(self.presets_dir.iterdir()):
+            if p.name.startswith((self.INLINE_PREFIX, "_tmp_")):
+                continue
             if p.suffix in (".pt", ".npz") or p.suffix in self.ALLOWED_EXTENSIONS:
                 presets.append({
                     "id": p.stem,
@@ -331,23 +526,7 @@ class ReferenceAudioManager:
             counter += 1
 
         try:
-            # Run generate_preset.py to convert audio -> embedding
-            proc = await asyncio.create_subprocess_exec(
-                "uv", "run", "python", "scripts/generate_preset.py",
-                "--audio", str(tmp_audio),
-                "--preset-id", preset_id,
-                "--output-dir", str(self.presets_dir),
-                "--device", "cuda",
-                cwd=str(self.miotts_cwd),
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.STDOUT,
-            )
-            stdout, _ = await asyncio.wait_for(proc.communicate(), timeout=120)
-            if proc.returncode != 0:
-                raise RuntimeError(
-                    f"generate_preset.py failed (exit {proc.returncode}): {stdout.decode()}"
-                )
-            logger.info("Created preset embedding: %s.pt", preset_id)
+            await self._generate_preset(tmp_audio, preset_id)
         finally:
             tmp_audio.unlink(missing_ok=True)
 
@@ -359,6 +538,90 @@ class ReferenceAudioManager:
             "type": "embedding",
         }
 
+    async def _generate_preset(self, audio_path: Path, preset_id: str):
+        """Run generate_preset.py to convert audio -> embedding (<preset_id>.pt)."""
+        proc = await asyncio.create_subprocess_exec(
+            "uv", "run", "python", "scripts/generate_preset.py",
+            "--audio", str(audio_path),
+            "--preset-id", preset_id,
+            "--output-dir", str(self.presets_dir),
+            "--device", "cuda",
+            cwd=str(self.miotts_cwd),
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+        )
+        stdout, _ = await asyncio.wait_for(proc.communicate(), timeout=120)
+        if proc.returncode != 0:
+            raise RuntimeError(
+                f"generate_preset.py failed (exit {proc.returncode}): {stdout.decode()}"
+            )
+        logger.info("Created preset embedding: %s.pt", preset_id)
+
+    def inline_preset(self, audio: bytes) -> str | None:
+        """Return the hidden preset for inline reference audio, if it exists yet.
+
+        Audio is converted in the background the second time it is seen (one-off
+        references are never converted), at most max_pending_inline at a time
+        queued behind a semaphore. Until the preset exists None is returned and
+        requests keep using the inline audio.
+        """
+        digest = hashlib.sha256(audio).hexdigest()[:32]
+        preset_id = f"{self.INLINE_PREFIX}{digest}"
+        pt_path = self.presets_dir / f"{preset_id}.pt"
+        if pt_path.exists():
+            os.utime(pt_path)  # Recency for pruning
+            self.inline_hits += 1
+            return preset_id
+        if digest in self._converting or digest in self._failed_inline:
+            return None
+        if digest not in self._seen_inline:
+            self._seen_inline[digest] = None
+            if len(self._seen_inline) > 1000:
+                self._seen_inline.popitem(last=False)
+            return None
+        if len(self._converting) >= self.max_pending_inline:
+            return None
+        ext = self.AUDIO_MAGIC.get(audio[:4])
+        if ext is None:
+            self._failed_inline.add(digest)
+            return None
+        self._seen_inline.pop(digest, None)
+        self._converting[digest] = asyncio.create_task(self._convert_inline(digest, preset_id, audio, ext))
+        return None
+
+    async def _convert_inline(self, digest: str, preset_id: str, audio: bytes, ext: str):
+        tmp_audio = self.presets_dir / f"_tmp_{preset_id}{ext}"
+        try:
+            async with self._convert_slots:
+                await asyncio.to_thread(tmp_audio.write_bytes, audio)
+                await self._generate_preset(tmp_audio, preset_id)
+            self.inline_conversions += 1
+            self._prune_inline()
+        except Exception as e:
+            logger.warning("Could not convert inline reference audio %s: %s", digest, e)
+            if len(self._failed_inline) > 1000:
+                self._failed_inline.clear()
+            self._failed_inline.add(digest)
+        finally:
+            tmp_audio.unlink(missing_ok=True)
+            self._converting.pop(digest, None)
+
+    def _prune_inline(self):
+        inline = sorted(
+            self.presets_dir.glob(f"{self.INLINE_PREFIX}*.pt"), key=lambda p: p.stat().st_mtime
+        )
+        for p in inline[: max(0, len(inline) - self.max_inline_presets)]:
+            p.unlink(missing_ok=True)
+
+    def inline_stats(self) -> dict:
+        return {
+            "presets": len(list(self.presets_dir.glob(f"{self.INLINE_PREFIX}*.pt"))),
+            "max_presets": self.max_inline_presets,
+            "converting": len(self._converting),
+            "hits": self.inline_hits,
+            "conversions": self.inline_conversions,
+        }
+
     def delete(self, preset_id: str) -> bool:
         deleted = False
         for p in self.presets_dir.iterdir():
@@ -368,12 +631,1349 @@ class ReferenceAudioManager:
         return deleted
 
 
+# ---------------------------------------------------------------------------
+# MioTTS upstream client
+# ---------------------------------------------------------------------------
+
+class Replica:
+    """One MioTTS API endpoint and its recent load / latency."""
+
+    def __init__(self, url: str, health_url: str | None = None):
+        self.url = url.rstrip("/")
+        self.health_url = health_url or f"{self.url}/health"
+        self.healthy = True
+        self.outstanding = 0
+        self.latency_ewma: float | None = None
+        self.requests = 0
+        self.errors = 0
+
+    def load_score(self, default_latency: float) -> float:
+        """Expected wait if one more request were sent here; lower is better."""
+        return (self.outstanding + 1) * (self.latency_ewma or default_latency)
+
+    def observe(self, latency: float):
+        if self.latency_ewma is None:
+            self.latency_ewma = latency
+        else:
+            self.latency_ewma = 0.7 * self.latency_ewma + 0.3 * latency
+
+    def get_info(self) -> dict:
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "outstanding": self.outstanding,
+            "latency_ewma_sec": round(self.latency_ewma, 3) if self.latency_ewma else None,
+            "requests": self.requests,
+            "errors": self.errors,
+        }
+
+
+def _parse_replicas(api_url: str | list) -> list[Replica]:
+    """``miotts.api_url`` is a URL, or a list of URLs / {url, health_url} dicts."""
+    entries = api_url if isinstance(api_url, list) else [api_url]
+    replicas = []
+    for entry in entries:
+        if isinstance(entry, dict):
+            replicas.append(Replica(entry["url"], entry.get("health_url")))
+        else:
+            replicas.append(Replica(entry))
+    return replicas
+
+
+class MioTTSUpstream:
+    """Long-lived, pooled HTTP client for one or more MioTTS API replicas.
+
+    One instance is created in ``lifespan`` and shared by every proxied
+    request, so connections are kept alive and reused instead of paying for a
+    new TCP handshake per synthesis. Each request goes to the healthy replica
+    with the lowest (outstanding requests + 1) x recent latency; a background
+    task polls each replica's health_url to take failed replicas out of
+    rotation and bring them back.
+    """
+
+    def __init__(self, api_url: str | list, config: dict):
+        self.replicas = _parse_replicas(api_url)
+        self.health_interval = float(config.get("health_interval", 5.0))
+        http2 = bool(config.get("http2", False))
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logger.warning("HTTP/2 requested but 'h2' is not installed; using HTTP/1.1")
+                http2 = False
+        self.http2 = http2
+        self.client = httpx.AsyncClient(
+            timeout=float(config.get("timeout", 120.0)),
+            limits=httpx.Limits(
+                max_connections=config.get("max_connections", 32),
+                max_keepalive_connections=config.get("max_keepalive_connections", 16),
+                keepalive_expiry=float(config.get("keepalive_expiry", 30.0)),
+            ),
+            http2=http2,
+        )
+        self.retries = int(config.get("retries", 2))
+        hedge_config = config.get("hedge", {})
+        self.hedge_enabled = bool(hedge_config.get("enabled", False))
+        self.hedge_percentile = float(hedge_config.get("percentile", 95))
+        self.hedge_min_delay = float(hedge_config.get("min_delay_ms", 200)) / 1000
+        self.max_hedges = int(hedge_config.get("max_hedges", 1))
+        self._latencies: deque[float] = deque(maxlen=500)
+        self.requests = 0
+        self.new_connections = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.retries_used = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._health_task: asyncio.Task | None = None
+
+    @property
+    def api_url(self) -> str:
+        return self.replicas[0].url
+
+    def pick(self, exclude: tuple[Replica, ...] = ()) -> Replica:
+        candidates = [r for r in self.replicas if r not in exclude] or list(self.replicas)
+        healthy = [r for r in candidates if r.healthy] or candidates
+        known = [r.latency_ewma for r in self.replicas if r.latency_ewma]
+        default_latency = sum(known) / len(known) if known else 1.0
+        return min(healthy, key=lambda r: r.load_score(default_latency))
+
+    async def _trace(self, event_name: str, info: dict):
+        if event_name == "connection.connect_tcp.complete":
+            self.new_connections += 1
+
+    def _begin(self, replica: Replica):
+        self.requests += 1
+        self.in_flight += 1
+        replica.requests += 1
+        replica.outstanding += 1
+
+    def _end(self, replica: Replica, start: float, error: Exception | None = None, cancelled: bool = False):
+        self.in_flight -= 1
+        replica.outstanding -= 1
+        if cancelled:
+            # A hedge loser or abandoned request says nothing about the replica's latency
+            return
+        if error is None:
+            latency = time.monotonic() - start
+            replica.observe(latency)
+            self._latencies.append(latency)
+            return
+        self.errors += 1
+        replica.errors += 1
+        if isinstance(error, httpx.ConnectError) and len(self.replicas) > 1:
+            # Stop routing here until the health check sees it recover
+            replica.healthy = False
+
+    async def _post_once(self, replica: Replica, path: str, **kwargs) -> httpx.Response:
+        self._begin(replica)
+        start = time.monotonic()
+        try:
+            resp = await self.client.post(
+                f"{replica.url}{path}", extensions={"trace": self._trace}, **kwargs
+            )
+        except Exception as e:
+            self._end(replica, start, e)
+            raise
+        except BaseException:
+            self._end(replica, start, cancelled=True)
+            raise
+        self._end(replica, start)
+        return resp
+
+    def hedge_delay(self) -> float | None:
+        """Seconds to wait before hedging, from the recent latency percentile."""
+        if not self.hedge_enabled or len(self.replicas) < 2 or len(self._latencies) < 20:
+            return None
+        ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * self.hedge_percentile / 100))
+        return max(ordered[index], self.hedge_min_delay)
+
+    async def post(self, path: str, **kwargs) -> httpx.Response:
+        """POST to the best replica, with failover and optional hedging.
+
+        Connection failures are retried on another replica while the retry
+        budget lasts. With hedging enabled, a request still running after the
+        recent latency percentile is duplicated to another replica and the
+        first response wins; the loser is cancelled.
+        """
+        tried: list[Replica] = []
+        pending: dict[asyncio.Task, bool] = {}  # task -> is hedge
+
+        def launch(hedge: bool = False):
+            replica = self.pick(exclude=tuple(tried))
+            tried.append(replica)
+            pending[asyncio.create_task(self._post_once(replica, path, **kwargs))] = hedge
+
+        launch()
+        retries_left = self.retries
+        hedges_left = self.max_hedges
+        delay = self.hedge_delay()
+        last_error: Exception | None = None
+        try:
+            while pending:
+                timeout = delay if hedges_left > 0 else None
+                done, _ = await asyncio.wait(
+                    pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    hedges_left -= 1
+                    self.hedges += 1
+                    launch(hedge=True)
+                    continue
+                for task in done:
+                    hedge = pending.pop(task)
+                    try:
+                        resp = task.result()
+                    except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+                        last_error = e
+                        if retries_left > 0:
+                            retries_left -= 1
+                            self.retries_used += 1
+                            launch()
+                        continue
+                    except httpx.HTTPError as e:
+                        last_error = e
+                        continue
+                    if hedge:
+                        self.hedge_wins += 1
+                    return resp
+            raise last_error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def open_stream(self, path: str, **kwargs) -> tuple[httpx.Response, Replica, float]:
+        """Send a request and return once the response headers arrive.
+
+        The body is left unread; pass the response, replica and start time
+        to ``relay`` to stream it out and release the connection. Latency is
+        measured from the start time, so waiting for headers is counted.
+        """
+        replica = self.pick()
+        self._begin(replica)
+        start = time.monotonic()
+        request = self.client.build_request(
+            "POST", f"{replica.url}{path}", extensions={"trace": self._trace}, **kwargs
+        )
+        try:
+            return await self.client.send(request, stream=True), replica, start
+        except Exception as e:
+            self._end(replica, start, e)
+            raise
+        except BaseException:
+            self._end(replica, start, cancelled=True)
+            raise
+
+    async def relay(self, resp: httpx.Response, replica: Replica, start: float):
+        error = None
+        completed = False
+        try:
+            async for chunk in resp.aiter_raw():
+                yield chunk
+            completed = True
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            await resp.aclose()
+            # Only a fully relayed body counts as a latency sample
+            self._end(replica, start, error, cancelled=not completed and error is None)
+
+    async def _check_health(self, replica: Replica):
+        try:
+            resp = await self.client.get(replica.health_url, timeout=2.0)
+            healthy = resp.status_code == 200
+        except httpx.HTTPError:
+            healthy = False
+        if healthy != replica.healthy:
+            logger.info("MioTTS replica %s is %s", replica.url, "healthy" if healthy else "unhealthy")
+        replica.healthy = healthy
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.gather(*(self._check_health(r) for r in self.replicas))
+            await asyncio.sleep(self.health_interval)
+
+    def start_health_checks(self):
+        if len(self.replicas) > 1:
+            self._health_task = asyncio.create_task(self._health_loop())
+
+    def stats(self) -> dict:
+        reused = max(self.requests - self.new_connections, 0)
+        return {
+            "api_url": self.api_url,
+            "http2": self.http2,
+            "requests": self.requests,
+            "in_flight": self.in_flight,
+            "errors": self.errors,
+            "new_connections": self.new_connections,
+            "reused_connections": reused,
+            "reuse_ratio": round(reused / self.requests, 3) if self.requests else None,
+            "retries": self.retries_used,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "hedge_delay_sec": self.hedge_delay(),
+            "replicas": [r.get_info() for r in self.replicas],
+        }
+
+    async def aclose(self):
+        if self._health_task:
+            self._health_task.cancel()
+        await self.client.aclose()
+
+
+# ---------------------------------------------------------------------------
+# TTS result cache
+# ---------------------------------------------------------------------------
+
+def tts_cache_key(body: dict, model: str | None) -> str:
+    """Canonical hash of a TTS request body plus the model serving it.
+
+    Inline reference audio is replaced by its SHA-256 so the key stays small,
+    and keys are serialized sorted so field order does not matter.
+    """
+    canonical = dict(body)
+    reference = canonical.get("reference") or {}
+    if isinstance(reference, dict):  # Anything else is left for MioTTS to reject
+        reference = dict(reference)
+        if "data" in reference:
+            data = reference.pop("data") or ""
+            reference["data_sha256"] = hashlib.sha256(str(data).encode()).hexdigest()
+        canonical["reference"] = reference
+    canonical["model"] = model
+    encoded = json.dumps(canonical, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+class TTSCache:
+    """Content-addressed cache of MioTTS responses.
+
+    Hot entries live in a byte-bounded in-memory LRU. Every entry is also
+    written to a size-bounded directory on disk, so entries evicted from
+    memory (or lost on restart) are still served from disk and promoted back
+    into memory on the next hit.
+    """
+
+    def __init__(self, cache_dir: Path, memory_bytes: int, disk_bytes: int):
+        self.cache_dir = cache_dir
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self._memory: OrderedDict[str, bytes] = OrderedDict()
+        self._memory_size = 0
+        self._disk: OrderedDict[str, int] = OrderedDict()
+        self._disk_size = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if self.disk_bytes > 0:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self._scan_disk()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.bin"
+
+    def _scan_disk(self):
+        entries = []
+        for p in self.cache_dir.glob("*.bin"):
+            st = p.stat()
+            entries.append((st.st_mtime, p.stem, st.st_size))
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self._disk_size += size
+        self._evict_disk()
+
+    def _remember(self, key: str, value: bytes):
+        if len(value) > self.memory_bytes:
+            return
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_size -= len(old)
+        self._memory[key] = value
+        self._memory_size += len(value)
+        while self._memory_size > self.memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_size -= len(evicted)
+
+    def _evict_disk(self):
+        while self._disk_size > self.disk_bytes and self._disk:
+            key, size = self._disk.popitem(last=False)
+            self._disk_size -= size
+            self._path(key).unlink(missing_ok=True)
+
+    def _write_file(self, key: str, value: bytes):
+        tmp = self.cache_dir / f".{key}.tmp"
+        tmp.write_bytes(value)
+        os.replace(tmp, self._path(key))
+
+    async def get(self, key: str) -> bytes | None:
+        value = self._memory.get(key)
+        if value is not None:
+            self._memory.move_to_end(key)
+            self.memory_hits += 1
+            return value
+        if key in self._disk:
+            try:
+                value = await asyncio.to_thread(self._path(key).read_bytes)
+            except FileNotFoundError:
+                self._disk_size -= self._disk.pop(key, 0)
+            else:
+                self._disk.move_to_end(key)
+                self._remember(key, value)
+                self.disk_hits += 1
+                return value
+        self.misses += 1
+        return None
+
+    async def put(self, key: str, value: bytes):
+        self._remember(key, value)
+        if self.disk_bytes <= 0 or len(value) > self.disk_bytes:
+            return
+        try:
+            await asyncio.to_thread(self._write_file, key, value)
+        except OSError as e:
+            logger.warning("Failed to write TTS cache entry %s: %s", key, e)
+            return
+        self._disk_size -= self._disk.pop(key, 0)
+        self._disk[key] = len(value)
+        self._disk_size += len(value)
+        self._evict_disk()
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_entries": len(self._memory),
+            "memory_bytes": self._memory_size,
+            "memory_limit_bytes": self.memory_bytes,
+            "disk_entries": len(self._disk),
+            "disk_bytes": self._disk_size,
+            "disk_limit_bytes": self.disk_bytes,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_ratio": round((lookups - self.misses) / lookups, 3) if lookups else None,
+        }
+
+
+# ---------------------------------------------------------------------------
+# Request coalescing
+# ---------------------------------------------------------------------------
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key into a single execution.
+
+    The first caller starts the work in its own task; callers arriving while
+    it runs wait on the same task. A waiter that is cancelled only stops
+    waiting - the shared call is cancelled once its last waiter is gone.
+    """
+
+    class _Call:
+        def __init__(self, task: asyncio.Task):
+            self.task = task
+            self.waiters = 0
+
+    def __init__(self):
+        self._calls: dict[str, SingleFlight._Call] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn) -> tuple[object, bool]:
+        """Run ``fn()`` or join the call already running for ``key``.
+
+        Returns the result and whether it was shared with an earlier caller.
+        """
+        call = self._calls.get(key)
+        shared = call is not None
+        if call is None:
+            call = self._Call(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+            self.executions += 1
+        else:
+            self.coalesced += 1
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task), shared
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                call.task.cancel()
+
+    def _forget(self, key: str, call: "SingleFlight._Call"):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def stats(self) -> dict:
+        return {
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._calls),
+        }
+
+
+# ---------------------------------------------------------------------------
+# Admission control
+# ---------------------------------------------------------------------------
+
+class QueueFullError(Exception):
+    def __init__(self, retry_after: float):
+        super().__init__("TTS queue is full")
+        self.retry_after = retry_after
+
+
+TTS_PRIORITIES = ("interactive", "bulk")
+
+
+class AdmissionQueue:
+    """Concurrency limit for upstream TTS calls with bounded priority queues.
+
+    At most ``max_in_flight`` calls run at once. Waiting requests queue per
+    priority class (up to ``max_queue`` each); interactive requests are
+    admitted ahead of bulk ones, except that ``bulk_share`` of the hand-offs
+    made while both classes are waiting go to bulk so it cannot starve.
+    When a class's queue is full, ``acquire`` fails fast with
+    ``QueueFullError`` so the caller can shed load instead of timing out.
+    """
+
+    def __init__(self, max_in_flight: int, max_queue: int, bulk_share: float = 0.2):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.bulk_share = bulk_share
+        self.in_flight = 0
+        self._waiters: dict[str, deque[asyncio.Future]] = {p: deque() for p in TTS_PRIORITIES}
+        self._bulk_credit = 0.0
+        self._avg_service_sec: float | None = None
+        self.admitted = 0
+        self.rejected = 0
+
+    @property
+    def queued(self) -> int:
+        return sum(len(w) for w in self._waiters.values())
+
+    def estimated_wait(self, priority: str = "interactive", position: int | None = None) -> float:
+        """Seconds until a request at ``position`` (1-based) would be admitted."""
+        if position is None:
+            if self.in_flight < self.max_in_flight and not self.queued:
+                return 0.0
+            ahead = len(self._waiters["interactive"])
+            if priority == "bulk":
+                ahead += len(self._waiters["bulk"])
+            position = ahead + 1
+        avg = self._avg_service_sec or 1.0
+        return math.ceil(position / self.max_in_flight) * avg
+
+    async def acquire(self, priority: str = "interactive"):
+        if self.in_flight < self.max_in_flight and not self.queued:
+            self.in_flight += 1
+            self.admitted += 1
+            return
+        waiters = self._waiters[priority]
+        if len(waiters) >= self.max_queue:
+            self.rejected += 1
+            raise QueueFullError(self.estimated_wait(priority))
+        fut = asyncio.get_running_loop().create_future()
+        waiters.append(fut)
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                # The slot was handed over just before cancellation; pass it on.
+                self.release()
+            elif fut in waiters:
+                # release() may already have popped and skipped the cancelled future
+                waiters.remove(fut)
+            raise
+        self.admitted += 1
+
+    def _next_waiter(self) -> asyncio.Future | None:
+        interactive, bulk = self._waiters["interactive"], self._waiters["bulk"]
+        if interactive and bulk:
+            self._bulk_credit += self.bulk_share
+            if self._bulk_credit >= 1:
+                self._bulk_credit -= 1
+                return bulk.popleft()
+            return interactive.popleft()
+        if interactive:
+            return interactive.popleft()
+        if bulk:
+            return bulk.popleft()
+        return None
+
+    def release(self):
+        while (fut := self._next_waiter()) is not None:
+            if not fut.done():
+                fut.set_result(None)  # Hand the slot straight to the next waiter
+                return
+        self.in_flight -= 1
+
+    def observe(self, service_sec: float):
+        if self._avg_service_sec is None:
+            self._avg_service_sec = service_sec
+        else:
+            self._avg_service_sec = 0.8 * self._avg_service_sec + 0.2 * service_sec
+
+    @asynccontextmanager
+    async def slot(self, priority: str = "interactive"):
+        await self.acquire(priority)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(time.monotonic() - start)
+            self.release()
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "queued": self.queued,
+            "queued_by_priority": {p: len(w) for p, w in self._waiters.items()},
+            "max_queue": self.max_queue,
+            "bulk_share": self.bulk_share,
+            "avg_service_sec": round(self._avg_service_sec, 3) if self._avg_service_sec else None,
+            "estimated_wait_sec": round(self.estimated_wait(), 3),
+            "estimated_wait_sec_by_priority": {
+                p: round(self.estimated_wait(p), 3) for p in TTS_PRIORITIES
+            },
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+        }
+
+
+# ---------------------------------------------------------------------------
+# Per-client rate limiting
+# ---------------------------------------------------------------------------
+
+class RateLimitedError(Exception):
+    def __init__(self, retry_after: float):
+        super().__init__("Rate limit exceeded")
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.level = burst
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        if now > self.updated:
+            self.level = min(self.burst, self.level + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def deficit(self, cost: float) -> float:
+        """Seconds until ``cost`` can be taken (0 if it can be taken now)."""
+        cost = min(cost, self.burst)  # Oversized requests pass once the bucket is full
+        if self.level >= cost:
+            return 0.0
+        return (cost - self.level) / self.rate if self.rate > 0 else math.inf
+
+    @property
+    def idle_sec(self) -> float:
+        """Seconds of idleness after which this bucket is full again."""
+        return (self.burst - self.level) / self.rate if self.rate > 0 else math.inf
+
+
+class RateLimiter:
+    """Per-client token buckets for requests/sec and estimated tokens/sec.
+
+    Clients are identified by API key (``Authorization: Bearer`` or
+    ``X-API-Key``), Tailscale identity (``Tailscale-User-Login``, set by
+    ``tailscale serve``) or client IP, in the order given by ``identify_by``.
+    Text length stands in for the token count: ``chars_per_token``
+    characters are charged as one token. Buckets live in memory only.
+    """
+
+    def __init__(self, config: dict):
+        self.requests_per_sec = float(config.get("requests_per_sec", 2))
+        self.request_burst = float(config.get("request_burst", 10))
+        self.tokens_per_sec = float(config.get("tokens_per_sec", 200))
+        self.token_burst = float(config.get("token_burst", 2000))
+        self.chars_per_token = float(config.get("chars_per_token", 1))
+        self.identify_by = list(config.get("identify_by", ["api_key", "tailscale", "ip"]))
+        self.trust_forwarded_for = bool(config.get("trust_forwarded_for", False))
+        self.clients: dict[str, dict] = {str(k): v or {} for k, v in (config.get("clients") or {}).items()}
+        self._buckets: dict[str, tuple[TokenBucket, TokenBucket]] = {}
+        self._last_prune = time.monotonic()
+        self.allowed = 0
+        self.limited = 0
+
+    def identify(self, conn: HTTPConnection) -> tuple[str, str]:
+        """Return ``(identity, raw value)`` for a request or WebSocket.
+
+        The identity is safe to show in stats (API keys are hashed); the raw
+        value is what per-client overrides in ``clients`` are matched against.
+        Only API keys listed in ``clients`` count, and Tailscale-User-Login only
+        from a loopback peer (``tailscale serve``) or with trust_forwarded_for;
+        otherwise a client could pick a fresh identity for every request.
+        """
+        headers = conn.headers
+        for method in self.identify_by:
+            if method == "api_key":
+                auth = headers.get("authorization", "")
+                key = auth[7:].strip() if auth.lower().startswith("bearer ") else headers.get("x-api-key")
+                if key and key in self.clients:
+                    return f"key:{hashlib.sha256(key.encode()).hexdigest()[:12]}", key
+            elif method == "tailscale":
+                login = headers.get("tailscale-user-login")
+                if login and (self.trust_forwarded_for or self._from_loopback(conn)):
+                    return f"tailscale:{login}", login
+            elif method == "ip":
+                ip = None
+                if self.trust_forwarded_for and headers.get("x-forwarded-for"):
+                    ip = headers["x-forwarded-for"].split(",")[0].strip()
+                if not ip and conn.client:
+                    ip = conn.client.host
+                if ip:
+                    return f"ip:{ip}", ip
+        return "anonymous", ""
+
+    @staticmethod
+    def _from_loopback(conn: HTTPConnection) -> bool:
+        try:
+            return conn.client is not None and ipaddress.ip_address(conn.client.host).is_loopback
+        except ValueError:
+            return False
+
+    def estimate_tokens(self, text) -> int:
+        return math.ceil(len(text) / self.chars_per_token) if isinstance(text, str) else 0
+
+    def _buckets_for(self, identity: str, raw: str) -> tuple[TokenBucket, TokenBucket]:
+        buckets = self._buckets.get(identity)
+        if buckets is None:
+            limits = self.clients.get(raw, {})
+            buckets = (
+                TokenBucket(float(limits.get("requests_per_sec", self.requests_per_sec)),
+                            float(limits.get("request_burst", self.request_burst))),
+                TokenBucket(float(limits.get("tokens_per_sec", self.tokens_per_sec)),
+                            float(limits.get("token_burst", self.token_burst))),
+            )
+            self._buckets[identity] = buckets
+        return buckets
+
+    def _prune(self, now: float):
+        # A bucket that has refilled completely is equivalent to a new one
+        if now - self._last_prune < 60:
+            return
+        self._last_prune = now
+        for identity, (requests, tokens) in list(self._buckets.items()):
+            if now - requests.updated >= max(requests.idle_sec, tokens.idle_sec):
+                del self._buckets[identity]
+
+    def check(self, client: tuple[str, str], tokens: int = 0, requests: int = 1) -> float:
+        """Charge a client; return 0 if allowed, else seconds until it would be."""
+        now = time.monotonic()
+        self._prune(now)
+        request_bucket, token_bucket = self._buckets_for(*client)
+        request_bucket.refill(now)
+        token_bucket.refill(now)
+        wait = max(request_bucket.deficit(requests), token_bucket.deficit(tokens))
+        if wait > 0:
+            self.limited += 1
+            return wait
+        request_bucket.level -= min(requests, request_bucket.burst)
+        token_bucket.level -= min(tokens, token_bucket.burst)
+        self.allowed += 1
+        return 0.0
+
+    def charge(self, client: tuple[str, str], tokens: int = 0, requests: int = 1):
+        retry_after = self.check(client, tokens, requests)
+        if retry_after:
+            raise RateLimitedError(retry_after)
+
+    async def throttle(self, client: tuple[str, str], tokens: int = 0, requests: int = 1):
+        """Wait until the client's buckets allow the charge, then take it."""
+        while retry_after := self.check(client, tokens, requests):
+            if math.isinf(retry_after):
+                raise RateLimitedError(retry_after)
+            await asyncio.sleep(retry_after)
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        clients = {}
+        for identity, (requests, tokens) in self._buckets.items():
+            clients[identity] = {
+                "requests_available": round(min(requests.burst, requests.level + (now - requests.updated) * requests.rate), 2),
+                "tokens_available": round(min(tokens.burst, tokens.level + (now - tokens.updated) * tokens.rate), 1),
+            }
+        return {
+            "requests_per_sec": self.requests_per_sec,
+            "request_burst": self.request_burst,
+            "tokens_per_sec": self.tokens_per_sec,
+            "token_burst": self.token_burst,
+            "allowed": self.allowed,
+            "limited": self.limited,
+            "clients": clients,
+        }
+
+
+# ---------------------------------------------------------------------------
+# Long-text chunking
+# ---------------------------------------------------------------------------
+
+SENTENCE_END_RE = re.compile(r"[。！？!?]+[」』）)\"'”’]*|\.+(?=\s|$)|\n+")
+CLAUSE_END_RE = re.compile(r"[、，,;；:：]+")
+
+
+def _split_after(text: str, pattern: re.Pattern) -> list[str]:
+    """Split ``text`` after every match of ``pattern``, keeping the delimiters."""
+    pieces = []
+    start = 0
+    for m in pattern.finditer(text):
+        pieces.append(text[start:m.end()])
+        start = m.end()
+    if start < len(text):
+        pieces.append(text[start:])
+    return pieces
+
+
+def _pack(pieces: list[str], max_chars: int) -> list[str]:
+    """Greedily join consecutive pieces into chunks of at most ``max_chars``."""
+    chunks: list[str] = []
+    current = ""
+    for piece in pieces:
+        if current and len(current) + len(piece) > max_chars:
+            chunks.append(current)
+            current = ""
+        current += piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def split_text(text: str, max_chars: int) -> list[str]:
+    """Split text into chunks at sentence boundaries, then clause boundaries.
+
+    Handles Japanese (。！？、) as well as Latin punctuation. A clause that is
+    still longer than ``max_chars`` is cut at ``max_chars``.
+    """
+    pieces: list[str] = []
+    for sentence in _split_after(text, SENTENCE_END_RE):
+        if len(sentence) <= max_chars:
+            pieces.append(sentence)
+            continue
+        for clause in _split_after(sentence, CLAUSE_END_RE):
+            pieces.extend(clause[i:i + max_chars] for i in range(0, len(clause), max_chars))
+    return [c.strip() for c in _pack(pieces, max_chars) if c.strip()]
+
+
+def _is_cjk(ch: str) -> bool:
+    # CJK punctuation, kana, ideographs and full-width forms
+    code = ord(ch)
+    return 0x3000 <= code <= 0x9FFF or 0xF900 <= code <= 0xFAFF or 0xFF00 <= code <= 0xFFEF
+
+
+def join_text(pieces: list[str]) -> str:
+    """Rejoin per-chunk text, restoring the space dropped between Latin sentences."""
+    out = ""
+    for piece in pieces:
+        if out and piece and not out[-1].isspace() and not piece[0].isspace() \
+                and not (_is_cjk(out[-1]) or _is_cjk(piece[0])):
+            out += " "
+        out += piece
+    return out
+
+
+def take_complete_text(buffer: str, max_chars: int) -> tuple[str, str]:
+    """Split a growing text buffer into a ready-to-synthesize prefix and the rest.
+
+    Everything up to the last sentence end is ready. A remainder without a
+    sentence end that grows past ``max_chars`` is released at its last clause
+    boundary (or hard-cut) so long run-on input still makes progress.
+    """
+    end = 0
+    for m in SENTENCE_END_RE.finditer(buffer):
+        end = m.end()
+    ready, rest = buffer[:end], buffer[end:]
+    while len(rest) > max_chars:
+        cut = max_chars
+        for m in CLAUSE_END_RE.finditer(rest, 0, max_chars):
+            cut = m.end()
+        ready, rest = ready + rest[:cut], rest[cut:]
+    return ready, rest
+
+
+def read_wav(data: bytes) -> tuple[tuple[int, int, int], bytes]:
+    """Return ``((channels, sample_width, sample_rate), frames)`` for a WAV file."""
+    with wave.open(io.BytesIO(data), "rb") as w:
+        return (w.getnchannels(), w.getsampwidth(), w.getframerate()), w.readframes(w.getnframes())
+
+
+def wav_stream_header(channels: int, width: int, rate: int) -> bytes:
+    """PCM WAV header with unknown (maximum) length, for streamed WAV bodies."""
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 0xFFFFFFFF, b"WAVE", b"fmt ", 16, 1, channels, rate,
+        rate * channels * width, channels * width, width * 8, b"data", 0xFFFFFFFF,
+    )
+
+
+def concat_wavs(segments: list[bytes], crossfade_ms: float = 0, silence_ms: float = 0) -> bytes:
+    """Concatenate WAV files with optional silence padding or linear crossfade.
+
+    All segments must share channel count, sample width and sample rate.
+    Crossfading is applied only to 16-bit audio and only when no silence is
+    inserted between segments.
+    """
+    params = None
+    frames: list[bytes] = []
+    for segment in segments:
+        seg_params, seg_frames = read_wav(segment)
+        if params is None:
+            params = seg_params
+        elif seg_params != params:
+            raise ValueError(f"WAV format mismatch: {seg_params} != {params}")
+        frames.append(seg_frames)
+    if params is None:
+        raise ValueError("No audio segments")
+    channels, width, rate = params
+    frame_size = channels * width
+
+    silence = b"\x00" * (int(rate * silence_ms / 1000) * frame_size)
+    fade_frames = int(rate * crossfade_ms / 1000) if width == 2 and not silence else 0
+
+    out = bytearray(frames[0])
+    for data in frames[1:]:
+        n = min(fade_frames, len(out) // frame_size, len(data) // frame_size)
+        if n > 0:
+            tail = array("h", bytes(out[-n * frame_size:]))
+            head = array("h", data[:n * frame_size])
+            if sys.byteorder == "big":
+                tail.byteswap()
+                head.byteswap()
+            for i in range(len(tail)):
+                gain = (i // channels) / n
+                tail[i] = max(-32768, min(32767, int(tail[i] * (1 - gain) + head[i] * gain)))
+            if sys.byteorder == "big":
+                tail.byteswap()
+            out[-n * frame_size:] = tail.tobytes()
+            data = data[n * frame_size:]
+        else:
+            out += silence
+        out += data
+
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(channels)
+        w.setsampwidth(width)
+        w.setframerate(rate)
+        w.writeframes(bytes(out))
+    return buf.getvalue()
+
+
+def _sum_timings(timings: list[dict]) -> dict:
+    total: dict = {}
+    for t in timings:
+        for k, v in (t or {}).items():
+            if isinstance(v, (int, float)):
+                total[k] = total.get(k, 0) + v
+    return total
+
+
+# ---------------------------------------------------------------------------
+# Audio transcoding
+# ---------------------------------------------------------------------------
+
+# format -> (media type, ffmpeg output arguments)
+AUDIO_FORMATS = {
+    "wav": ("audio/wav", []),
+    "mp3": ("audio/mpeg", ["-f", "mp3", "-c:a", "libmp3lame"]),
+    "opus": ("audio/ogg", ["-f", "ogg", "-c:a", "libopus", "-application", "voip"]),
+    "flac": ("audio/flac", ["-f", "flac", "-c:a", "flac"]),
+}
+
+ACCEPT_AUDIO_FORMATS = {
+    "audio/wav": "wav",
+    "audio/mpeg": "mp3",
+    "audio/ogg": "opus",
+    "audio/opus": "opus",
+    "audio/flac": "flac",
+}
+
+
+class TranscodeError(Exception):
+    pass
+
+
+def _run_ffmpeg(ffmpeg: str, wav: bytes, args: list[str]) -> bytes:
+    """Encode WAV bytes with ffmpeg. Runs in a worker process."""
+    proc = subprocess.run(
+        [ffmpeg, "-hide_banner", "-loglevel", "error", "-i", "pipe:0", *args, "pipe:1"],
+        input=wav,
+        capture_output=True,
+    )
+    if proc.returncode != 0:
+        raise TranscodeError(proc.stderr.decode(errors="replace").strip() or f"ffmpeg exited {proc.returncode}")
+    return proc.stdout
+
+
+class AudioTranscoder:
+    """Encode WAV into compressed formats with ffmpeg in a process pool.
+
+    Piping audio through ffmpeg and waiting on it happens in worker
+    processes, so the event loop never blocks on an encode and at most
+    ``workers`` encodes run at once.
+    """
+
+    def __init__(self, config: dict):
+        self.ffmpeg = shutil.which(config.get("ffmpeg", "ffmpeg"))
+        self.workers = int(config.get("workers", 2))
+        self.bitrates: dict[str, str] = {"mp3": "64k", "opus": "32k", **(config.get("bitrates") or {})}
+        self._pool: ProcessPoolExecutor | None = None
+        self.encoded = 0
+        self.failed = 0
+        self.encode_sec = 0.0
+
+    @property
+    def available(self) -> bool:
+        return self.ffmpeg is not None
+
+    def args(self, fmt: str) -> list[str]:
+        args = list(AUDIO_FORMATS[fmt][1])
+        if self.bitrates.get(fmt):
+            args += ["-b:a", str(self.bitrates[fmt])]
+        return args
+
+    async def transcode(self, wav: bytes, fmt: str) -> bytes:
+        if self._pool is None:
+            # spawn: forking a process that runs an event loop and threads is unsafe
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        start = time.monotonic()
+        try:
+            data = await asyncio.get_running_loop().run_in_executor(
+                self._pool, _run_ffmpeg, self.ffmpeg, wav, self.args(fmt)
+            )
+        except BrokenProcessPool as e:
+            self.failed += 1
+            self.shutdown()  # Start a fresh pool on the next request
+            raise TranscodeError(f"transcoder worker died: {e}") from e
+        except Exception:
+            self.failed += 1
+            raise
+        self.encoded += 1
+        self.encode_sec += time.monotonic() - start
+        return data
+
+    def stats(self) -> dict:
+        return {
+            "available": self.available,
+            "workers": self.workers,
+            "bitrates": self.bitrates,
+            "encoded": self.encoded,
+            "failed": self.failed,
+            "avg_encode_sec": round(self.encode_sec / self.encoded, 3) if self.encoded else None,
+        }
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+# ---------------------------------------------------------------------------
+# Persistent job queue
+# ---------------------------------------------------------------------------
+
+class JobStore:
+    """SQLite-backed store of asynchronous TTS jobs.
+
+    Job bodies and states live in the database; results are written to
+    ``results_dir`` as the raw MioTTS JSON response. All database access runs
+    in a worker thread behind a lock so the event loop never blocks on disk.
+    """
+
+    FIELDS = "id, status, created_at, started_at, finished_at, attempts, error"
+
+    def __init__(self, db_path: Path, results_dir: Path):
+        self.results_dir = results_dir
+        self.results_dir.mkdir(parents=True, exist_ok=True)
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._db:
+            self._db.execute(
+                """CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    body TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    not_before REAL NOT NULL DEFAULT 0,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    error TEXT
+                )"""
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+            # Jobs that were running when the cockpit stopped go back to the queue
+            recovered = self._db.execute(
+                "UPDATE jobs SET status = 'queued', started_at = NULL WHERE status = 'running'"
+            ).rowcount
+        if recovered:
+            logger.info("Re-queued %d interrupted TTS jobs", recovered)
+
+    def result_path(self, job_id: str) -> Path:
+        return self.results_dir / f"{job_id}.json"
+
+    def _execute(self, sql: str, params: tuple = ()) -> list[dict]:
+        with self._lock, self._db:
+            return [dict(row) for row in self._db.execute(sql, params).fetchall()]
+
+    def _update(self, sql: str, params: tuple = ()) -> int:
+        with self._lock, self._db:
+            return self._db.execute(sql, params).rowcount
+
+    async def submit(self, body: dict) -> dict:
+        job_id = uuid.uuid4().hex
+        await asyncio.to_thread(
+            self._update,
+            "INSERT INTO jobs (id, status, body, created_at) VALUES (?, 'queued', ?, ?)",
+            (job_id, json.dumps(body), time.time()),
+        )
+        return await self.get(job_id)
+
+    async def get(self, job_id: str) -> dict | None:
+        rows = await asyncio.to_thread(
+            self._execute, f"SELECT {self.FIELDS} FROM jobs WHERE id = ?", (job_id,)
+        )
+        return rows[0] if rows else None
+
+    async def list(self, status: str | None = None, limit: int = 100) -> list[dict]:
+        if status:
+            sql = f"SELECT {self.FIELDS} FROM jobs WHERE status = ? ORDER BY created_at DESC LIMIT ?"
+            return await asyncio.to_thread(self._execute, sql, (status, limit))
+        sql = f"SELECT {self.FIELDS} FROM jobs ORDER BY created_at DESC LIMIT ?"
+        return await asyncio.to_thread(self._execute, sql, (limit,))
+
+    async def counts(self) -> dict:
+        rows = await asyncio.to_thread(
+            self._execute, "SELECT status, COUNT(*) AS n FROM jobs GROUP BY status"
+        )
+        return {row["status"]: row["n"] for row in rows}
+
+    def _claim(self) -> dict | None:
+        with self._lock, self._db:
+            row = self._db.execute(
+                "SELECT id, body, attempts FROM jobs WHERE status = 'queued' AND not_before <= ? "
+                "ORDER BY created_at LIMIT 1",
+                (time.time(),),
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute(
+                "UPDATE jobs SET status = 'running', started_at = ? WHERE id = ?",
+                (time.time(), row["id"]),
+            )
+            return {"id": row["id"], "body": json.loads(row["body"]), "attempts": row["attempts"]}
+
+    async def claim(self) -> dict | None:
+        """Mark the oldest runnable queued job as running and return it."""
+        return await asyncio.to_thread(self._claim)
+
+    def _complete(self, job_id: str, content: bytes):
+        tmp = self.results_dir / f".{job_id}.tmp"
+        tmp.write_bytes(content)
+        os.replace(tmp, self.result_path(job_id))
+        self._update(
+            "UPDATE jobs SET status = 'done', finished_at = ?, error = NULL "
+            "WHERE id = ? AND status = 'running'",
+            (time.time(), job_id),
+        )
+
+    async def complete(self, job_id: str, content: bytes):
+        await asyncio.to_thread(self._complete, job_id, content)
+
+    async def fail(self, job_id: str, error: str, attempts: int):
+        await asyncio.to_thread(
+            self._update,
+            "UPDATE jobs SET status = 'failed', finished_at = ?, error = ?, attempts = ? "
+            "WHERE id = ? AND status = 'running'",
+            (time.time(), error, attempts, job_id),
+        )
+
+    async def requeue(self, job_id: str, error: str, attempts: int, delay: float):
+        await asyncio.to_thread(
+            self._update,
+            "UPDATE jobs SET status = 'queued', started_at = NULL, error = ?, attempts = ?, "
+            "not_before = ? WHERE id = ? AND status = 'running'",
+            (error, attempts, time.time() + delay, job_id),
+        )
+
+    async def cancel(self, job_id: str) -> bool:
+        updated = await asyncio.to_thread(
+            self._update,
+            "UPDATE jobs SET status = 'cancelled', finished_at = ? "
+            "WHERE id = ? AND status IN ('queued', 'running')",
+            (time.time(), job_id),
+        )
+        return updated > 0
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class JobRunner:
+    """Pool of workers feeding queued jobs through the TTS proxy pipeline.
+
+    Upstream outages (MioTTS not running, queue full) re-queue the job with a
+    delay without using up an attempt, so jobs wait out restarts and model
+    switches. Other retryable errors count against ``max_attempts``.
+    """
+
+    def __init__(self, store: JobStore, workers: int, max_attempts: int, retry_delay: float):
+        self.store = store
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self._tasks: list[asyncio.Task] = []
+        self._running: dict[str, asyncio.Task] = {}
+        self._wake = asyncio.Event()
+        self._resumed = asyncio.Event()
+        self._resumed.set()
+
+    def start(self):
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self):
+        self._wake.set()
+
+    def pause(self):
+        self._resumed.clear()
+
+    def resume(self):
+        self._resumed.set()
+
+    @property
+    def paused(self) -> bool:
+        return not self._resumed.is_set()
+
+    async def cancel(self, job_id: str) -> bool:
+        cancelled = await self.store.cancel(job_id)
+        task = self._running.get(job_id)
+        if task:
+            task.cancel()
+        return cancelled
+
+    async def _worker(self):
+        while True:
+            await self._resumed.wait()
+            job = await self.store.claim()
+            if job is None:
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=1.0)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            task = asyncio.create_task(self._run(job))
+            self._running[job["id"]] = task
+            try:
+                await asyncio.wait({task})
+            except asyncio.CancelledError:
+                task.cancel()
+                raise
+            finally:
+                self._running.pop(job["id"], None)
+
+    async def _run(self, job: dict):
+        attempts = job["attempts"]
+        try:
+            result = await _synthesize(job["body"], priority="bulk")
+        except HTTPException as e:
+            status, detail = e.status_code, str(e.detail)
+        except Exception as e:
+            logger.exception("TTS job %s failed", job["id"])
+            status, detail = 500, str(e)
+        else:
+            if result.status_code == 200:
+                await self.store.complete(job["id"], result.content)
+                return
+            status, detail = result.status_code, str(_error_detail(result.content))
+
+        if status in (429, 502, 503):
+            await self.store.requeue(job["id"], detail, attempts, self.retry_delay)
+            return
+        attempts += 1
+        if status >= 500 and attempts < self.max_attempts:
+            await self.store.requeue(job["id"], detail, attempts, self.retry_delay * attempts)
+        else:
+            await self.store.fail(job["id"], detail, attempts)
+
+    def stats(self) -> dict:
+        return {"workers": self.workers, "running": len(self._running), "paused": self.paused}
+
+
+# ---------------------------------------------------------------------------
+# Event fan-out
+# ---------------------------------------------------------------------------
+
+class EventHub:
+    """Publish events to any number of subscribers, one bounded queue each.
+
+    A subscriber that falls ``max_backlog`` events behind is cut off instead
+    of holding memory or slowing publishers down; its stream ends and the
+    client reconnects to a fresh snapshot.
+    """
+
+    def __init__(self, max_backlog: int = 256):
+        self.max_backlog = max_backlog
+        self._subscribers: set[asyncio.Queue] = set()
+        self._active = asyncio.Event()
+        self.published = 0
+        self.dropped = 0
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscribers)
+
+    async def wait_active(self):
+        await self._active.wait()
+
+    def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(self.max_backlog + 1)
+        self._subscribers.add(queue)
+        self._active.set()
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+        if not self._subscribers:
+            self._active.clear()
+
+    def publish(self, event: str, data):
+        self.published += 1
+        for queue in list(self._subscribers):
+            if queue.qsize() >= self.max_backlog:
+                self.unsubscribe(queue)
+                self.dropped += 1
+                queue.put_nowait(None)  # Tell the stream to end
+            else:
+                queue.put_nowait((event, data))
+
+
 # ---------------------------------------------------------------------------
 # FastAPI App
 # ---------------------------------------------------------------------------
 
 manager: ServiceManager | None = None
 audio_manager: ReferenceAudioManager | None = None
+upstream: MioTTSUpstream | None = None
+tts_cache: TTSCache | None = None
+coalescer: SingleFlight | None = None
+admission: AdmissionQueue | None = None
+rate_limiter: RateLimiter | None = None
+transcoder: AudioTranscoder | None = None
+job_runner: JobRunner | None = None
+events: EventHub | None = None
 _config: dict = {}
 
 
@@ -422,7 +2022,7 @@ def _apply_model_to_services(mgr: ServiceManager, model_id: str, gpu_mem_util: s
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    global manager, audio_manager, _config
+    global manager, audio_manager, upstream, tts_cache, coalescer, admission, rate_limiter, transcoder, job_runner, events, _config
     _config = load_config()
     manager = ServiceManager(_config)
     miotts_config = _config.get("miotts", {})
@@ -430,7 +2030,49 @@ async def lifespan(app: FastAPI):
     miotts_cwd = expand_path(
         _config.get("services", {}).get("miotts", {}).get("cwd", ".")
     )
-    audio_manager = ReferenceAudioManager(presets_dir, miotts_cwd)
+    audio_manager = ReferenceAudioManager(
+        presets_dir,
+        miotts_cwd,
+        max_inline_presets=miotts_config.get("inline_presets", {}).get("max_presets", 200),
+        max_concurrent_inline=int(miotts_config.get("inline_presets", {}).get("max_concurrent", 1)),
+        max_pending_inline=int(miotts_config.get("inline_presets", {}).get("max_pending", 16)),
+    )
+    upstream = MioTTSUpstream(
+        miotts_config.get("api_url", "http://localhost:8001"),
+        miotts_config.get("client", {}),
+    )
+    upstream.start_health_checks()
+    cache_config = miotts_config.get("cache", {})
+    if cache_config.get("enabled", True):
+        tts_cache = TTSCache(
+            expand_path(cache_config["dir"]) if "dir" in cache_config else CACHE_DIR / "tts",
+            memory_bytes=int(cache_config.get("memory_mb", 256) * 1024 * 1024),
+            disk_bytes=int(cache_config.get("disk_mb", 2048) * 1024 * 1024),
+        )
+    if miotts_config.get("coalesce", True):
+        coalescer = SingleFlight()
+    admission_config = miotts_config.get("admission", {})
+    admission = AdmissionQueue(
+        max_in_flight=admission_config.get("max_in_flight", 8),
+        max_queue=admission_config.get("max_queue", 64),
+        bulk_share=float(admission_config.get("bulk_share", 0.2)),
+    )
+    rate_limit_config = miotts_config.get("rate_limit", {})
+    if rate_limit_config.get("enabled", False):
+        rate_limiter = RateLimiter(rate_limit_config)
+    transcode_config = miotts_config.get("transcode", {})
+    if transcode_config.get("enabled", True):
+        transcoder = AudioTranscoder(transcode_config)
+        if not transcoder.available:
+            logger.warning("ffmpeg not found; mp3/opus/flac output is unavailable")
+    jobs_config = miotts_config.get("jobs", {})
+    jobs_dir = expand_path(jobs_config["dir"]) if "dir" in jobs_config else JOBS_DIR
+    job_runner = JobRunner(
+        JobStore(jobs_dir / "jobs.sqlite3", jobs_dir / "results"),
+        workers=jobs_config.get("workers", 2),
+        max_attempts=jobs_config.get("max_attempts", 3),
+        retry_delay=float(jobs_config.get("retry_delay", 10)),
+    )
 
     # Apply persisted model selection
     state = _load_state()
@@ -442,10 +2084,25 @@ async def lifespan(app: FastAPI):
             _apply_model_to_services(manager, saved_model, model["gpu_memory_utilization"])
             logger.info("Restored model selection: %s", saved_model)
 
+    job_runner.start()
+    events = EventHub()
+    manager.on_status_change = lambda status: events.publish("status", status)
+    manager.start_monitor()
+    event_task = asyncio.create_task(_publish_events())
+
     logger.info("Control panel ready. Managing %d services.", len(manager.services))
     yield
+    event_task.cancel()
+    if job_runner:
+        await job_runner.stop()
+        job_runner.store.close()
     if manager:
         await manager.stop_all()
+        await manager.aclose()
+    if upstream:
+        await upstream.aclose()
+    if transcoder:
+        transcoder.shutdown()
 
 
 app = FastAPI(title="MioTTS Cockpit", lifespan=lifespan)
@@ -455,7 +2112,7 @@ app = FastAPI(title="MioTTS Cockpit", lifespan=lifespan)
 
 @app.get("/api/status")
 async def get_status():
-    return await manager.get_status()
+    return manager.get_status()
 
 
 @app.post("/api/start")
@@ -511,8 +2168,7 @@ async def get_logs(service_id: str, lines: int = 200, filter_health: bool = True
 
 # --- GPU metrics ---
 
-@app.get("/api/gpu")
-async def get_gpu_info():
+def _read_gpu_info() -> dict:
     try:
         result = subprocess.run(
             ["nvidia-smi", "--query-gpu=name,memory.used,memory.total,utilization.gpu",
@@ -552,24 +2208,99 @@ async def get_gpu_info():
     return {"name": None, "memory_used_mb": None, "memory_total_mb": None, "utilization_percent": None}
 
 
+@app.get("/api/gpu")
+async def get_gpu_info():
+    return await asyncio.to_thread(_read_gpu_info)
+
+
+# --- Live events (replaces polling of status, GPU and logs) ---
+
+LOG_TAIL_INTERVAL = 0.5
+
+
+async def _publish_events():
+    """Feed GPU samples and new log lines to /api/events subscribers.
+
+    Sampling only runs while someone is subscribed. Status events come from
+    the health monitor via ServiceManager.on_status_change.
+    """
+    gpu_interval = float(_config.get("events", {}).get("gpu_interval", 5))
+    while True:
+        await events.wait_active()
+        offsets: dict[str, int] = {}  # A missing offset starts at the current end of the log
+        last_gpu = None
+        next_gpu = 0.0
+        while events.subscribers:
+            try:
+                for svc in manager.services.values():
+                    lines, offsets[svc.id] = await asyncio.to_thread(svc.read_log_lines, offsets.get(svc.id))
+                    lines = [l for l in lines if not any(p in l for p in HEALTH_CHECK_PATTERNS)]
+                    if lines:
+                        events.publish("log", {"service": svc.id, "lines": lines})
+                if time.monotonic() >= next_gpu:
+                    next_gpu = time.monotonic() + gpu_interval
+                    gpu = await asyncio.to_thread(_read_gpu_info)
+                    if gpu != last_gpu:
+                        last_gpu = gpu
+                        events.publish("gpu", gpu)
+            except Exception:
+                logger.exception("Event publisher iteration failed")
+            await asyncio.sleep(LOG_TAIL_INTERVAL)
+
+
+@app.get("/api/events")
+async def event_stream():
+    """Server-Sent Events: "status" (service list), "gpu" (sample) and "log"
+    ({service, lines}) events, pushed as they happen.
+
+    The current status and GPU sample are sent on connect; log events only
+    carry lines written after that, so clients load history from /api/logs.
+    """
+    async def stream():
+        queue = events.subscribe()
+        try:
+            yield _sse("status", manager.get_status())
+            yield _sse("gpu", await asyncio.to_thread(_read_gpu_info))
+            while True:
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                if item is None:
+                    return
+                yield _sse(*item)
+        finally:
+            events.unsubscribe(queue)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 # --- Model configuration (MioTTS-specific) ---
 
 class ModelChangeRequest(BaseModel):
     model_id: str
 
 
-@app.get("/api/config")
-async def get_config():
-    models = _config.get("miotts", {}).get("models", [])
+def _current_model() -> str | None:
     vllm_svc = manager.services.get("vllm")
-    current_model = None
     if vllm_svc:
         try:
             idx = vllm_svc.command.index("--model")
-            current_model = vllm_svc.command[idx + 1]
+            return vllm_svc.command[idx + 1]
         except (ValueError, IndexError):
             pass
-    return {"current_model": current_model, "models": models}
+    return None
+
+
+@app.get("/api/config")
+async def get_config():
+    models = _config.get("miotts", {}).get("models", [])
+    return {"current_model": _current_model(), "models": models}
 
 
 @app.post("/api/config/model")
@@ -582,36 +2313,917 @@ async def change_model(req: ModelChangeRequest):
     was_running = any(
         s.state in ("running", "starting") for s in manager.services.values()
     )
-    if was_running:
-        await manager.stop_all()
+    # Hold queued jobs while services restart; interrupted jobs are re-queued
+    job_runner.pause()
+    try:
+        if was_running:
+            await manager.stop_all()
 
-    _apply_model_to_services(manager, req.model_id, model["gpu_memory_utilization"])
-    _save_state({"current_model": req.model_id})
-    logger.info("Model changed to %s", req.model_id)
+        _apply_model_to_services(manager, req.model_id, model["gpu_memory_utilization"])
+        _save_state({"current_model": req.model_id})
+        logger.info("Model changed to %s", req.model_id)
 
-    if was_running:
-        await manager.start_all()
+        if was_running:
+            await manager.start_all()
+    finally:
+        job_runner.resume()
 
     return {"status": "ok", "model": req.model_id}
 
 
 # --- TTS proxy (forwards to MioTTS API) ---
 
+def _upstream_error(e: httpx.HTTPError) -> HTTPException:
+    if isinstance(e, httpx.ConnectError):
+        return HTTPException(status_code=502, detail="MioTTS API is not running")
+    if isinstance(e, httpx.TimeoutException):
+        return HTTPException(status_code=504, detail="TTS generation timed out")
+    return HTTPException(status_code=502, detail=f"MioTTS API error: {e}")
+
+
+def _queue_full_error(e: QueueFullError) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail="TTS queue is full, retry later",
+        headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))},
+    )
+
+
+def _charge_client(conn: HTTPConnection, text=None, requests: int = 1):
+    """Apply the per-client rate limit to a request, raising 429 when exceeded."""
+    if rate_limiter is None:
+        return
+    try:
+        rate_limiter.charge(rate_limiter.identify(conn), rate_limiter.estimate_tokens(text), requests)
+    except RateLimitedError as e:
+        raise HTTPException(
+            status_code=429,
+            detail="Rate limit exceeded, retry later",
+            headers={"Retry-After": str(max(1, math.ceil(min(e.retry_after, 3600))))},
+        )
+
+
+async def _throttle_client(client: tuple[str, str] | None, text) -> None:
+    """Wait for the client's rate limit instead of failing (batch and streaming work)."""
+    if rate_limiter is None or client is None:
+        return
+    try:
+        await rate_limiter.throttle(client, rate_limiter.estimate_tokens(text))
+    except RateLimitedError:
+        raise HTTPException(status_code=429, detail="Rate limit exceeded")
+
+
+async def _relay_with_slot(resp: httpx.Response, replica: Replica, admitted: float, upstream_start: float):
+    try:
+        async for chunk in upstream.relay(resp, replica, upstream_start):
+            yield chunk
+    finally:
+        admission.observe(time.monotonic() - admitted)
+        admission.release()
+
+
+# Body fields the cockpit itself acts on; requests using them skip passthrough
+PASSTHROUGH_PARSED_FIELDS_RE = re.compile(
+    rb'"(?:chunking|priority)"\s*:|"format"\s*:\s*"(?:' + "|".join(AUDIO_FORMATS).encode() + rb')"'
+)
+
+
+async def _proxy_tts_passthrough(request: Request, priority: str) -> StreamingResponse:
+    """Relay the request and response bodies as raw bytes, without parsing."""
+    try:
+        await admission.acquire(priority)
+    except QueueFullError as e:
+        raise _queue_full_error(e)
+    admitted = time.monotonic()
+    try:
+        resp, replica, upstream_start = await upstream.open_stream(
+            "/v1/tts",
+            content=request.stream(),
+            headers={"content-type": request.headers.get("content-type", "application/json")},
+        )
+    except BaseException as e:
+        admission.release()
+        if isinstance(e, httpx.HTTPError):
+            raise _upstream_error(e)
+        raise
+    headers = {
+        k: v for k, v in resp.headers.items()
+        if k in ("content-length", "content-encoding")
+    }
+    return StreamingResponse(
+        _relay_with_slot(resp, replica, admitted, upstream_start),
+        status_code=resp.status_code,
+        media_type=resp.headers.get("content-type", "application/json"),
+        headers=headers,
+    )
+
+
+class TTSResult(NamedTuple):
+    status_code: int
+    content: bytes  # MioTTS JSON response body
+    cache: str | None = None  # "HIT" / "MISS", or None when the cache was bypassed
+    coalesced: bool = False  # Result was shared with an identical in-flight request
+
+
+async def _fetch_tts(key: str, content: bytes, priority: str) -> tuple[int, bytes]:
+    try:
+        async with admission.slot(priority):
+            resp = await upstream.post(
+                "/v1/tts", content=content, headers={"content-type": "application/json"}
+            )
+    except QueueFullError as e:
+        raise _queue_full_error(e)
+    except httpx.HTTPError as e:
+        raise _upstream_error(e)
+    if tts_cache is not None and resp.status_code == 200:
+        await tts_cache.put(key, resp.content)
+    return resp.status_code, resp.content
+
+
+def _use_inline_preset(body: dict) -> dict | None:
+    """Rewrite a base64 reference to its hidden preset once one has been generated."""
+    reference = body.get("reference")
+    if not isinstance(reference, dict) or reference.get("type") != "base64":
+        return None
+    if not _config.get("miotts", {}).get("inline_presets", {}).get("enabled", True):
+        return None
+    data = str(reference.get("data") or "")
+    if data.startswith("data:"):
+        data = data.partition(",")[2]
+    try:
+        audio = base64.b64decode(data, validate=True)
+    except ValueError:
+        return None
+    preset_id = audio_manager.inline_preset(audio)
+    if preset_id is None:
+        return None
+    return {**body, "reference": {"type": "preset", "preset_id": preset_id}}
+
+
+async def _synthesize(
+    body: dict, raw: bytes | None = None, use_cache: bool = True, priority: str = "interactive"
+) -> TTSResult:
+    """Run one MioTTS request through the cache, coalescing and admission queue.
+
+    ``raw`` is forwarded as-is when given, otherwise ``body`` is serialized.
+    A coalesced request is admitted with the priority of the call it joins.
+    """
+    use_cache = use_cache and tts_cache is not None
+    key = tts_cache_key(body, _current_model())
+    if use_cache:
+        cached = await tts_cache.get(key)
+        if cached is not None:
+            return TTSResult(200, cached, "HIT")
+    # The key is computed from the original body, so a request rewritten to a
+    # cached preset still shares cache entries with its inline-audio twin.
+    rewritten = _use_inline_preset(body)
+    if rewritten is not None:
+        body, raw = rewritten, None
+    content = raw if raw is not None else json.dumps(body).encode()
+    coalesced = False
+    if coalescer is not None:
+        (status_code, data), coalesced = await coalescer.do(
+            key, lambda: _fetch_tts(key, content, priority)
+        )
+    else:
+        status_code, data = await _fetch_tts(key, content, priority)
+    return TTSResult(status_code, data, "MISS" if use_cache else None, coalesced)
+
+
+def _output_options(body: dict) -> dict:
+    output = body.get("output")
+    return output if isinstance(output, dict) else {}
+
+
+def _audio_format(request: Request, body: dict | None = None) -> str | None:
+    """Audio format requested via ``output.format`` or Accept; None means JSON."""
+    if body is not None:
+        fmt = _output_options(body).get("format")
+        if fmt in AUDIO_FORMATS:
+            return fmt
+    accept = request.headers.get("accept", "")
+    for media_type, fmt in ACCEPT_AUDIO_FORMATS.items():
+        if media_type in accept:
+            return fmt
+    return None
+
+
+async def _transcode(wav: bytes, fmt: str) -> bytes:
+    """Encode WAV as ``fmt``, caching the result next to the raw audio."""
+    if fmt == "wav":
+        return wav
+    if transcoder is None or not transcoder.available:
+        raise HTTPException(status_code=501, detail=f"{fmt} output requires ffmpeg on the cockpit host")
+    key = None
+    if tts_cache is not None:
+        digest = hashlib.sha256(wav)
+        digest.update(json.dumps(transcoder.args(fmt)).encode())
+        key = f"{digest.hexdigest()}.{fmt}"
+        cached = await tts_cache.get(key)
+        if cached is not None:
+            return cached
+    try:
+        data = await transcoder.transcode(wav, fmt)
+    except TranscodeError as e:
+        raise HTTPException(status_code=500, detail=f"Transcoding to {fmt} failed: {e}")
+    if key is not None:
+        await tts_cache.put(key, data)
+    return data
+
+
+async def _audio_response(content: bytes, fmt: str = "wav", headers: dict | None = None) -> Response:
+    """Decode a base64 MioTTS result into a raw audio response in ``fmt``.
+
+    Metadata that used to travel in the JSON body moves into headers; the
+    normalized text is percent-encoded since headers are latin-1 only.
+    """
+    data = json.loads(content)
+    headers = dict(headers or {})
+    headers["X-TTS-Token-Count"] = str(data.get("token_count", ""))
+    headers["X-TTS-Timings"] = json.dumps(data.get("timings") or {}, separators=(",", ":"))
+    if data.get("normalized_text") is not None:
+        headers["X-TTS-Normalized-Text"] = quote(data["normalized_text"])
+    audio = await _transcode(base64.b64decode(data["audio"]), fmt)
+    return Response(content=audio, media_type=AUDIO_FORMATS[fmt][0], headers=headers)
+
+
+def _chunking_options(body: dict) -> dict:
+    """Merge a request's ``chunking`` field over miotts.chunking defaults."""
+    options = {"max_chars": 100, "crossfade_ms": 0, "silence_ms": 120}
+    options.update(_config.get("miotts", {}).get("chunking", {}))
+    requested = body.get("chunking")
+    if isinstance(requested, dict):
+        options.update(requested)
+    try:
+        options["max_chars"] = int(options["max_chars"])
+        options["crossfade_ms"] = float(options["crossfade_ms"])
+        options["silence_ms"] = float(options["silence_ms"])
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="chunking max_chars, crossfade_ms and silence_ms must be numbers")
+    if options["max_chars"] < 1:
+        raise HTTPException(status_code=400, detail="chunking max_chars must be at least 1")
+    if not (0 <= options["crossfade_ms"] <= 10_000 and 0 <= options["silence_ms"] <= 10_000):
+        raise HTTPException(status_code=400, detail="chunking crossfade_ms and silence_ms must be between 0 and 10000")
+    return options
+
+
+async def _synthesize_limited(slots: asyncio.Semaphore, body: dict, **kwargs) -> TTSResult:
+    """``_synthesize`` behind a per-request semaphore.
+
+    Chunks of one request wait here, in text order, instead of all entering
+    the admission queue at once, where long text would overflow max_queue.
+    """
+    async with slots:
+        return await _synthesize(body, **kwargs)
+
+
+async def _synthesize_chunks(
+    body: dict, use_cache: bool = True, priority: str = "interactive"
+) -> tuple[list[str], list]:
+    """Split ``body['text']`` and start one synthesis task per chunk.
+
+    Returns the chunks and their tasks, in text order. The tasks run
+    concurrently; callers await them in order.
+    """
+    options = _chunking_options(body)
+    chunks = split_text(str(body.get("text", "")), options["max_chars"])
+    if not chunks:
+        raise HTTPException(status_code=400, detail="No text to synthesize")
+    base = {k: v for k, v in body.items() if k not in ("chunking", "text")}
+    base["output"] = {**_output_options(base), "format": "base64"}
+    slots = asyncio.Semaphore(admission.max_in_flight)
+    tasks = [
+        asyncio.ensure_future(
+            _synthesize_limited(slots, {**base, "text": chunk}, use_cache=use_cache, priority=priority)
+        )
+        for chunk in chunks
+    ]
+    return chunks, tasks
+
+
+async def _proxy_tts_chunked(
+    body: dict, audio_format: str | None, use_cache: bool, priority: str = "interactive"
+) -> Response:
+    """Synthesize long text as concurrent chunks and stitch the audio together."""
+    options = _chunking_options(body)
+    start = time.monotonic()
+    chunks, tasks = await _synthesize_chunks(body, use_cache, priority)
+    try:
+        results = await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+    for result in results:
+        if result.status_code != 200:
+            return Response(content=result.content, status_code=result.status_code, media_type="application/json")
+
+    parts = [json.loads(r.content) for r in results]
+    try:
+        audio = concat_wavs(
+            [base64.b64decode(p["audio"]) for p in parts],
+            crossfade_ms=options["crossfade_ms"],
+            silence_ms=options["silence_ms"],
+        )
+    except (ValueError, wave.Error) as e:
+        raise HTTPException(status_code=502, detail=f"Cannot join audio chunks: {e}")
+    timings = _sum_timings([p.get("timings") for p in parts])
+    timings["wall_sec"] = round(time.monotonic() - start, 4)
+    combined = json.dumps({
+        "audio": base64.b64encode(audio).decode(),
+        "token_count": sum(p.get("token_count") or 0 for p in parts),
+        "timings": timings,
+        "normalized_text": join_text([p.get("normalized_text") or "" for p in parts]),
+        "chunks": len(chunks),
+    }).encode()
+    if audio_format:
+        return await _audio_response(combined, audio_format, {"X-TTS-Chunks": str(len(chunks))})
+    return Response(content=combined, media_type="application/json")
+
+
+def _error_detail(content: bytes):
+    try:
+        return json.loads(content).get("detail")
+    except (ValueError, AttributeError):
+        return content.decode(errors="replace")
+
+
+def _sse(event: str, data: dict) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode()
+
+
+async def _stream_chunks(body: dict, use_cache: bool, priority: str = "interactive"):
+    """Yield ``(index, chunk, result)`` in text order as each chunk completes.
+
+    Chunks are synthesized concurrently, so chunk N+1 is usually ready by the
+    time chunk N has been sent; the first item arrives after one chunk's
+    latency. Pending synthesis is cancelled if the consumer stops early.
+    """
+    chunks, tasks = await _synthesize_chunks(body, use_cache, priority)
+    try:
+        for index, (chunk, task) in enumerate(zip(chunks, tasks)):
+            yield index, chunk, await task
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def _proxy_tts_chunked_stream(
+    body: dict, use_cache: bool, priority: str = "interactive"
+) -> StreamingResponse:
+    """Stream each chunk's audio as a Server-Sent Event as soon as it is ready.
+
+    Events: ``chunk`` (index, text and the MioTTS result for that chunk),
+    then ``done`` with totals, or ``error`` if a chunk fails.
+    """
+    start = time.monotonic()
+    # Split and validate before the response starts so errors are plain HTTP errors
+    stream = _stream_chunks(body, use_cache, priority)
+    first = await anext(stream)
+
+    async def events():
+        timings = []
+        token_count = 0
+        first_audio_sec = None
+        try:
+            index, chunk, result = first
+            while True:
+                if result.status_code != 200:
+                    yield _sse("error", {"index": index, "status": result.status_code,
+                                         "detail": _error_detail(result.content)})
+                    return
+                data = json.loads(result.content)
+                if first_audio_sec is None:
+                    first_audio_sec = round(time.monotonic() - start, 4)
+                timings.append(data.get("timings"))
+                token_count += data.get("token_count") or 0
+                yield _sse("chunk", {"index": index, "text": chunk, **data})
+                try:
+                    index, chunk, result = await anext(stream)
+                except StopAsyncIteration:
+                    break
+                except HTTPException as e:
+                    yield _sse("error", {"index": index + 1, "status": e.status_code, "detail": e.detail})
+                    return
+            total = _sum_timings(timings)
+            total["wall_sec"] = round(time.monotonic() - start, 4)
+            total["first_audio_sec"] = first_audio_sec
+            yield _sse("done", {"chunks": len(timings), "token_count": token_count, "timings": total})
+        finally:
+            await stream.aclose()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _request_priority(request: Request, body: dict | None = None, default: str = "interactive") -> str:
+    """Priority class from the body's ``priority`` field or an X-TTS-Priority header.
+
+    The body field is removed so it is not forwarded to MioTTS.
+    """
+    priority = body.pop("priority", None) if isinstance(body, dict) else None
+    priority = priority or request.headers.get("x-tts-priority") or default
+    if priority not in TTS_PRIORITIES:
+        raise HTTPException(
+            status_code=400, detail=f"Unknown priority: {priority}. Allowed: {list(TTS_PRIORITIES)}"
+        )
+    return priority
+
+
+DISCONNECT_POLL_SEC = 0.25
+
+# Requests abandoned before MioTTS answered, by reason
+abandoned = {"disconnected": 0, "deadline": 0}
+
+
+def _request_deadline(request: Request) -> float | None:
+    """Monotonic deadline from an ``X-Request-Timeout: <seconds>`` header."""
+    value = request.headers.get("x-request-timeout")
+    if value is None:
+        return None
+    try:
+        timeout = float(value)
+    except ValueError:
+        timeout = 0
+    if not timeout > 0:
+        raise HTTPException(status_code=400, detail="X-Request-Timeout must be a positive number of seconds")
+    return time.monotonic() + timeout
+
+
+async def _while_connected(request: Request, coro, deadline: float | None = None):
+    """Await ``coro`` only while the client is still waiting for it.
+
+    The work is cancelled when the client disconnects or ``deadline`` passes;
+    cancellation propagates through coalescing and the admission queue, so
+    the upstream request is aborted and its slot released. Only call this
+    once the request body has been read, since polling for a disconnect
+    consumes receive messages.
+    """
+    task = asyncio.ensure_future(coro)
+    try:
+        while True:
+            timeout = DISCONNECT_POLL_SEC
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    abandoned["deadline"] += 1
+                    raise HTTPException(status_code=504, detail="Request deadline exceeded")
+                timeout = min(timeout, remaining)
+            done, _ = await asyncio.wait({task}, timeout=timeout)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                abandoned["disconnected"] += 1
+                logger.info("Client disconnected; cancelling TTS request")
+                raise HTTPException(status_code=499, detail="Client disconnected")
+    finally:
+        task.cancel()
+
+
 @app.post("/api/tts")
 async def proxy_tts(request: Request):
-    miotts_url = _config.get("miotts", {}).get("api_url", "http://localhost:8001")
+    use_cache = tts_cache is not None and "no-cache" not in request.headers.get("cache-control", "")
+    passthrough = _config.get("miotts", {}).get("passthrough", False)
+    if passthrough and not use_cache and _audio_format(request) is None:
+        # A byte scan, not a parse: a false match only costs the parsed path
+        if not PASSTHROUGH_PARSED_FIELDS_RE.search(await request.body()):
+            priority = _request_priority(request)
+            _charge_client(request)  # The body is not parsed, so only the request rate applies
+            return await _proxy_tts_passthrough(request, priority)
+
+    deadline = _request_deadline(request)
+    raw = await request.body()
     try:
-        body = await request.json()
-    except Exception:
+        body = json.loads(raw)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid JSON body")
+    if not isinstance(body, dict):
+        raise HTTPException(status_code=400, detail="Expected a JSON object")
+    _charge_client(request, body.get("text"))
+
+    if "priority" in body:
+        raw = None
+    priority = _request_priority(request, body)
+    audio_format = _audio_format(request, body)
+    if audio_format:
+        # MioTTS always returns base64 to the cockpit; decoding and transcoding
+        # happen here so all output formats share cache entries.
+        body["output"] = {**_output_options(body), "format": "base64"}
+        raw = None
+
+    if body.get("chunking"):
+        if _chunking_options(body).get("stream"):
+            return await _proxy_tts_chunked_stream(body, use_cache, priority)
+        return await _while_connected(
+            request, _proxy_tts_chunked(body, audio_format, use_cache, priority), deadline
+        )
+
+    result = await _while_connected(request, _synthesize(body, raw, use_cache, priority), deadline)
+    headers = {"X-Cache": result.cache} if result.cache else {}
+    if result.coalesced:
+        headers["X-Coalesced"] = "1"
+    if audio_format and result.status_code == 200:
+        return await _audio_response(result.content, audio_format, headers)
+    return Response(
+        content=result.content,
+        status_code=result.status_code,
+        media_type="application/json",
+        headers=headers,
+    )
+
+
+def _ndjson_line(record: dict, result: bytes | None = None) -> bytes:
+    """Serialize one NDJSON record, splicing ``result`` in without re-encoding it.
+
+    ``result`` must be a JSON document.
+    """
+    line = json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode()
+    if result is not None:
+        if b"\n" in result:
+            result = json.dumps(json.loads(result), separators=(",", ":")).encode()
+        line = line[:-1] + b',"result":' + result + b"}"
+    return line + b"\n"
+
+
+async def _synthesize_batch_item(
+    index: int, body: dict, priority: str, client: tuple[str, str] | None = None
+) -> bytes:
+    if not isinstance(body, dict):
+        return _ndjson_line({"index": index, "status": 400, "error": "Item must be a JSON object"})
+    body.pop("priority", None)
+    for attempt in range(5):
+        try:
+            await _throttle_client(client, body.get("text"))
+            result = await _synthesize(body, priority=priority)
+            break
+        except HTTPException as e:
+            if e.status_code == 429 and attempt < 4:
+                # Batch items queue up behind the admission limit instead of failing
+                await asyncio.sleep(float((e.headers or {}).get("Retry-After", 1)))
+                continue
+            return _ndjson_line({"index": index, "status": e.status_code, "error": e.detail})
+    if result.status_code != 200:
+        try:
+            json.loads(result.content)
+        except ValueError:
+            # Plain-text error pages cannot be spliced into the line as JSON
+            error = result.content.decode(errors="replace")
+            return _ndjson_line({"index": index, "status": result.status_code, "error": error})
+        return _ndjson_line({"index": index, "status": result.status_code}, result.content)
+    return _ndjson_line(
+        {"index": index, "status": 200, "cache": result.cache, "coalesced": result.coalesced},
+        result.content,
+    )
+
+
+@app.post("/api/tts/batch")
+async def tts_batch(request: Request, concurrency: int | None = None):
+    """Fan a list of TTS bodies out to MioTTS and stream results as NDJSON.
+
+    Lines are emitted as soon as each item finishes, so they are not in input
+    order; every line carries the item's ``index``. Batches run at bulk
+    priority unless an X-TTS-Priority header says otherwise.
+    """
+    priority = _request_priority(request, default="bulk")
+    try:
+        items = json.loads(await request.body())
+    except ValueError:
         raise HTTPException(status_code=400, detail="Invalid JSON body")
+    if isinstance(items, dict):
+        items = items.get("items")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array of TTS requests")
+
+    batch_config = _config.get("miotts", {}).get("batch", {})
+    max_items = batch_config.get("max_items", 1000)
+    if len(items) > max_items:
+        raise HTTPException(status_code=400, detail=f"Too many items (max {max_items})")
+    max_concurrency = batch_config.get("max_concurrency", 16)
+    concurrency = max(1, min(concurrency or batch_config.get("concurrency", 4), max_concurrency))
+    # Items are paced by the client's rate limit rather than rejected
+    client = rate_limiter.identify(request) if rate_limiter else None
+
+    async def stream():
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def run(index: int, body: dict) -> bytes:
+            async with semaphore:
+                return await _synthesize_batch_item(index, body, priority, client)
+
+        tasks = [asyncio.create_task(run(i, body)) for i, body in enumerate(items)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+@app.websocket("/ws/tts")
+async def ws_tts(websocket: WebSocket):
+    """Incremental text-in / audio-out over one WebSocket.
+
+    Client messages (JSON text frames):
+      {"type": "config", "reference": {...}, "llm": {...}, "chunking": {...}}
+      {"type": "text", "text": "..."}  - appended; complete sentences are synthesized
+      {"type": "flush"}                - synthesize whatever text is buffered
+      {"type": "end"}                  - flush, send remaining audio, then "done"
+
+    For each segment the server sends a JSON "audio" message (seq, text,
+    token_count, timings, ...) followed by a binary frame with the WAV data.
+    Segments are synthesized concurrently and delivered in order.
+    """
+    await websocket.accept()
+    settings: dict = {}
+    buffer = ""
+    seq = 0
+    pending: asyncio.Queue = asyncio.Queue()
+    client = rate_limiter.identify(websocket) if rate_limiter else None
+    slots = asyncio.Semaphore(admission.max_in_flight)
+
+    async def synthesize(body: dict) -> TTSResult:
+        await _throttle_client(client, body["text"])
+        return await _synthesize_limited(slots, body)
+
+    def dispatch(text: str):
+        nonlocal seq
+        body = {k: v for k, v in settings.items() if k not in ("type", "chunking")}
+        body["output"] = {**_output_options(body), "format": "base64"}
+        for chunk in split_text(text, _chunking_options(settings)["max_chars"]):
+            task = asyncio.ensure_future(synthesize({**body, "text": chunk}))
+            pending.put_nowait((seq, chunk, task))
+            seq += 1
+
+    async def sender():
+        while True:
+            item = await pending.get()
+            if item is None:
+                await websocket.send_json({"type": "done"})
+                return
+            n, chunk, task = item
+            try:
+                result = await task
+            except HTTPException as e:
+                await websocket.send_json({"type": "error", "seq": n, "status": e.status_code, "detail": e.detail})
+                continue
+            if result.status_code != 200:
+                await websocket.send_json({"type": "error", "seq": n, "status": result.status_code,
+                                           "detail": _error_detail(result.content)})
+                continue
+            data = json.loads(result.content)
+            audio = base64.b64decode(data.pop("audio"))
+            await websocket.send_json({"type": "audio", "seq": n, "text": chunk, "bytes": len(audio), **data})
+            await websocket.send_bytes(audio)
+
+    sender_task = asyncio.create_task(sender())
+    try:
+        while True:
+            frame = await websocket.receive()
+            if frame["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(frame.get("code", 1000))
+            if frame.get("text") is None:
+                await websocket.send_json({"type": "error", "status": 400, "detail": "Expected a JSON text frame"})
+                continue
+            try:
+                message = json.loads(frame["text"])
+                kind = message.get("type")
+            except (ValueError, AttributeError):
+                await websocket.send_json({"type": "error", "status": 400, "detail": "Invalid JSON message"})
+                continue
+            if kind == "config":
+                try:
+                    _chunking_options({**settings, **message})
+                except HTTPException as e:
+                    await websocket.send_json({"type": "error", "status": e.status_code, "detail": e.detail})
+                    continue
+                settings.update(message)
+            elif kind == "text":
+                buffer += str(message.get("text", ""))
+                ready, buffer = take_complete_text(buffer, _chunking_options(settings)["max_chars"])
+                if ready.strip():
+                    dispatch(ready)
+            elif kind in ("flush", "end"):
+                if buffer.strip():
+                    dispatch(buffer)
+                buffer = ""
+                if kind == "end":
+                    pending.put_nowait(None)
+                    await sender_task
+                    await websocket.close()
+                    return
+            else:
+                await websocket.send_json({"type": "error", "status": 400, "detail": f"Unknown message type: {kind}"})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender_task.cancel()
+        while not pending.empty():
+            item = pending.get_nowait()
+            if item is not None:
+                item[2].cancel()
+
+
+@app.get("/api/tts/stats")
+async def tts_stats():
+    return {
+        "upstream": upstream.stats(),
+        "cache": tts_cache.stats() if tts_cache else None,
+        "coalescing": coalescer.stats() if coalescer else None,
+        "queue": admission.stats(),
+        "rate_limit": rate_limiter.stats() if rate_limiter else None,
+        "transcode": transcoder.stats() if transcoder else None,
+        "inline_presets": audio_manager.inline_stats(),
+        "abandoned": abandoned,
+    }
+
+
+@app.get("/api/tts/queue")
+async def tts_queue():
+    return admission.stats()
+
+
+# --- Asynchronous TTS jobs ---
+
+@app.post("/api/jobs")
+async def submit_job(request: Request):
     try:
-        async with httpx.AsyncClient(timeout=120.0) as client:
-            resp = await client.post(f"{miotts_url}/v1/tts", json=body)
-            return JSONResponse(content=resp.json(), status_code=resp.status_code)
-    except httpx.ConnectError:
-        raise HTTPException(status_code=502, detail="MioTTS API is not running")
-    except httpx.TimeoutException:
-        raise HTTPException(status_code=504, detail="TTS generation timed out")
+        body = json.loads(await request.body())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid JSON body")
+    if not isinstance(body, dict) or not body.get("text"):
+        raise HTTPException(status_code=400, detail="Expected a TTS request with text")
+    _charge_client(request, body["text"])
+    body.pop("priority", None)  # Jobs always run at bulk priority
+    # Results are stored as MioTTS JSON; WAV is decoded when fetched
+    body["output"] = {**_output_options(body), "format": "base64"}
+    job = await job_runner.store.submit(body)
+    job_runner.notify()
+    return job
+
+
+@app.get("/api/jobs")
+async def list_jobs(status: str | None = None, limit: int = 100):
+    return {
+        "jobs": await job_runner.store.list(status, limit),
+        "counts": await job_runner.store.counts(),
+        "runner": job_runner.stats(),
+    }
+
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = await job_runner.store.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return job
+
+
+@app.get("/api/jobs/{job_id}/result")
+async def get_job_result(job_id: str, request: Request, format: str | None = None):
+    job = await job_runner.store.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    if job["status"] != "done":
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}")
+    content = await asyncio.to_thread(job_runner.store.result_path(job_id).read_bytes)
+    if format is not None and format not in AUDIO_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown format: {format}. Allowed: {list(AUDIO_FORMATS)}")
+    audio_format = format or _audio_format(request)
+    if audio_format:
+        return await _audio_response(content, audio_format)
+    return Response(content=content, media_type="application/json")
+
+
+@app.delete("/api/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    if await job_runner.cancel(job_id):
+        return {"status": "cancelled", "id": job_id}
+    job = await job_runner.store.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    raise HTTPException(status_code=409, detail=f"Job is already {job['status']}")
+
+
+# --- OpenAI-compatible speech API ---
+
+class SpeechRequest(BaseModel):
+    model: str
+    input: str
+    voice: str
+    response_format: str = "wav"
+    stream: bool = False
+    stream_format: str | None = None
+
+
+OPENAI_MEDIA_TYPES = {
+    "wav": "audio/wav",
+    "pcm": "audio/pcm",
+    "mp3": "audio/mpeg",
+    "opus": "audio/ogg",
+    "flac": "audio/flac",
+}
+
+
+def _resolve_openai_model(name: str) -> str:
+    """Map an OpenAI ``model`` to the id of a configured miotts.models entry."""
+    miotts_config = _config.get("miotts", {})
+    name = miotts_config.get("openai", {}).get("models", {}).get(name, name)
+    model = next(
+        (m for m in miotts_config.get("models", []) if name in (m["id"], m.get("name"))),
+        None,
+    )
+    if not model:
+        raise HTTPException(status_code=400, detail=f"Unknown model: {name}")
+    current = _current_model()
+    if current and model["id"] != current:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Model {model['id']} is not loaded (current: {current}). Switch it via /api/config/model.",
+        )
+    return model["id"]
+
+
+def _resolve_openai_voice(voice: str) -> str:
+    """Map an OpenAI ``voice`` to a preset id known to the ReferenceAudioManager."""
+    voice = _config.get("miotts", {}).get("openai", {}).get("voices", {}).get(voice, voice)
+    presets = {p["id"] for p in audio_manager.list_presets() if p["type"] == "embedding"}
+    if voice not in presets:
+        raise HTTPException(status_code=400, detail=f"Unknown voice: {voice}")
+    return voice
+
+
+@app.post("/v1/audio/speech")
+async def openai_speech(req: SpeechRequest, request: Request):
+    """OpenAI-style speech endpoint backed by the chunked TTS pipeline.
+
+    ``voice`` selects a preset, ``model`` must name the configured model that
+    is currently loaded. With ``stream`` (or ``stream_format: "audio"``) wav
+    and pcm audio is sent chunk by chunk as it is synthesized; compressed
+    formats are encoded once the whole text is done.
+    """
+    if req.response_format not in OPENAI_MEDIA_TYPES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported response_format: {req.response_format}. Allowed: {sorted(OPENAI_MEDIA_TYPES)}",
+        )
+    _resolve_openai_model(req.model)
+    _charge_client(request, req.input)
+    body = {
+        "text": req.input,
+        "reference": {"type": "preset", "preset_id": _resolve_openai_voice(req.voice)},
+        "chunking": True,
+    }
+    options = _chunking_options(body)
+    media_type = OPENAI_MEDIA_TYPES[req.response_format]
+
+    if (req.stream or req.stream_format == "audio") and req.response_format in ("wav", "pcm"):
+        stream = _stream_chunks(body, use_cache=True)
+        first = await anext(stream)
+        if first[2].status_code != 200:
+            await stream.aclose()
+            return Response(content=first[2].content, status_code=first[2].status_code, media_type="application/json")
+
+        async def audio():
+            try:
+                item = first
+                params = None
+                while True:
+                    _, _, result = item
+                    if result.status_code != 200:
+                        logger.warning("Speech stream aborted: %s", _error_detail(result.content))
+                        return
+                    seg_params, frames = read_wav(base64.b64decode(json.loads(result.content)["audio"]))
+                    if params is None:
+                        params = seg_params
+                        if req.response_format == "wav":
+                            yield wav_stream_header(*params)
+                    else:
+                        channels, width, rate = params
+                        yield b"\x00" * (int(rate * options["silence_ms"] / 1000) * channels * width)
+                    yield frames
+                    try:
+                        item = await anext(stream)
+                    except (StopAsyncIteration, HTTPException):
+                        return
+            finally:
+                await stream.aclose()
+
+        return StreamingResponse(audio(), media_type=media_type)
+
+    deadline = _request_deadline(request)
+    if req.response_format != "pcm":
+        return await _while_connected(
+            request, _proxy_tts_chunked(body, req.response_format, use_cache=True), deadline
+        )
+    resp = await _while_connected(request, _proxy_tts_chunked(body, "wav", use_cache=True), deadline)
+    if resp.status_code != 200:
+        return resp
+    params, frames = read_wav(resp.body)
+    return Response(content=frames, media_type=media_type, headers={"X-Sample-Rate": str(params[2])})
 
 
 # --- Reference audio management (MioTTS-specific) ---
@@ -654,6 +3266,177 @@ if FRONTEND_DIR.exists():
         )
 
 
+# ---------------------------------------------------------------------------
+# Bulk synthesis CLI
+# ---------------------------------------------------------------------------
+
+def _load_manifest(path: Path) -> dict[str, dict]:
+    done = {}
+    if path.exists():
+        with open(path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                done[entry.get("id")] = entry
+    return done
+
+
+# Record fields forwarded to /api/tts; anything else (ids, metadata) stays local
+SYNTH_BODY_FIELDS = ("reference", "llm", "output")
+
+
+def _read_synth_items(args: argparse.Namespace) -> list[tuple[str, dict]]:
+    """Turn JSONL lines into ``(item_id, tts_body)`` pairs."""
+    items = []
+    seen = set()
+    with open(args.input) as f:
+        for lineno, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"Line {lineno} is not valid JSON: {e}") from None
+            if not isinstance(record, dict):
+                raise ValueError(f"Line {lineno} is not a JSON object")
+            if not isinstance(record.get(args.text_field), str):
+                raise ValueError(f"Line {lineno} has no {args.text_field!r} text field")
+            item_id = str(record.get(args.id_field) or record.get("request_id") or f"line-{lineno:05d}")
+            item_id = re.sub(r"[^\w.-]", "_", item_id)
+            if item_id in seen:
+                raise ValueError(f"Duplicate id {item_id!r} on line {lineno}")
+            seen.add(item_id)
+            body = {k: record[k] for k in SYNTH_BODY_FIELDS if k in record}
+            body["text"] = record[args.text_field]
+            if "reference" not in body:
+                if not args.preset:
+                    raise ValueError(f"Line {lineno} has no reference; pass --preset")
+                body["reference"] = {"type": "preset", "preset_id": args.preset}
+            body["output"] = {**_output_options(body), "format": "base64"}
+            if args.chunking:
+                body["chunking"] = True
+            items.append((item_id, body))
+    return items
+
+
+async def _synth_one(client: httpx.AsyncClient, url: str, body: dict, retries: int) -> dict:
+    for attempt in range(retries + 1):
+        try:
+            resp = await client.post(url, json=body)
+        except httpx.TransportError as e:
+            error = str(e) or type(e).__name__
+            delay = 2.0 ** attempt
+        else:
+            if resp.status_code == 200:
+                return resp.json()
+            error = f"HTTP {resp.status_code}: {_error_detail(resp.content)}"
+            if resp.status_code not in (429, 502, 503, 504):
+                break
+            delay = float(resp.headers.get("retry-after") or 2.0 ** attempt)
+        if attempt < retries:
+            await asyncio.sleep(delay)
+    raise RuntimeError(error)
+
+
+async def _synth_run(args: argparse.Namespace) -> int:
+    out_dir = Path(args.out)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = out_dir / "manifest.jsonl"
+    done = _load_manifest(manifest_path)
+
+    all_items = _read_synth_items(args)
+    items = [
+        (item_id, body) for item_id, body in all_items
+        if not (done.get(item_id, {}).get("status") == "ok" and (out_dir / f"{item_id}.wav").exists())
+    ]
+    skipped = len(all_items) - len(items)
+    logger.info("%d items to synthesize (%d already done) -> %s", len(items), skipped, args.url)
+
+    queue: asyncio.Queue = asyncio.Queue()
+    for item in items:
+        queue.put_nowait(item)
+    failures = 0
+    completed = 0
+
+    # Bulk runs must not crowd out interactive users of the cockpit proxy
+    headers = {"X-TTS-Priority": "bulk"}
+    async with httpx.AsyncClient(timeout=args.timeout, headers=headers) as client:
+        with open(manifest_path, "a") as manifest:
+
+            async def worker():
+                nonlocal failures, completed
+                while not queue.empty():
+                    item_id, body = queue.get_nowait()
+                    start = time.monotonic()
+                    entry = {"id": item_id, "text": body["text"]}
+                    try:
+                        data = await _synth_one(client, args.url, body, args.retries)
+                        wav_path = out_dir / f"{item_id}.wav"
+                        await asyncio.to_thread(wav_path.write_bytes, base64.b64decode(data["audio"]))
+                        entry.update(
+                            status="ok",
+                            file=wav_path.name,
+                            token_count=data.get("token_count"),
+                            timings=data.get("timings"),
+                        )
+                    except Exception as e:
+                        failures += 1
+                        entry.update(status="error", error=str(e))
+                    entry["elapsed_sec"] = round(time.monotonic() - start, 3)
+                    manifest.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                    manifest.flush()
+                    completed += 1
+                    logger.info("[%d/%d] %s: %s (%.2fs)", completed, len(items), item_id,
+                                entry["status"], entry["elapsed_sec"])
+
+            await asyncio.gather(*(worker() for _ in range(args.workers)))
+
+    logger.info("Finished: %d ok, %d failed", len(items) - failures, failures)
+    return 1 if failures else 0
+
+
+def synth_main():
+    """Synthesize a JSONL file of TTS requests with parallel workers.
+
+    Each line is an /api/tts body (or any object with a text field, see
+    --text-field). Audio goes to OUT/<id>.wav and per-item results to
+    OUT/manifest.jsonl; items already recorded as ok are skipped on re-run.
+    """
+    parser = argparse.ArgumentParser(prog="miotts-synth", description=synth_main.__doc__.splitlines()[0])
+    parser.add_argument("input", help="JSONL file with one TTS request per line")
+    parser.add_argument("-o", "--out", default="tts_output", help="Output directory (default: tts_output)")
+    parser.add_argument("-j", "--workers", type=int, default=4, help="Concurrent requests (default: 4)")
+    parser.add_argument("--url", help="TTS endpoint (default: cockpit proxy at http://localhost:8080/api/tts)")
+    parser.add_argument("--direct", action="store_true",
+                        help="Call the MioTTS API from services.yaml directly instead of the cockpit proxy")
+    parser.add_argument("--preset", help="Preset id for lines without a reference")
+    parser.add_argument("--text-field", default="text", help="Field holding the text (default: text)")
+    parser.add_argument("--id-field", default="id", help="Field holding the item id (default: id)")
+    parser.add_argument("--chunking", action="store_true", help="Split long text (proxy only)")
+    parser.add_argument("--retries", type=int, default=3, help="Retries for busy/unavailable upstream")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Per-request timeout in seconds")
+    args = parser.parse_args()
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.retries < 0:
+        parser.error("--retries must not be negative")
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    if not args.url:
+        if args.direct:
+            api_url = load_config().get("miotts", {}).get("api_url", "http://localhost:8001")
+            args.url = f"{_parse_replicas(api_url)[0].url}/v1/tts"
+        else:
+            args.url = "http://localhost:8080/api/tts"
+    try:
+        sys.exit(asyncio.run(_synth_run(args)))
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+
 # ---------------------------------------------------------------------------
 # Entry point
 # ---------------------------------------------------------------------------
@@ -663,7 +3446,8 @@ def main():
         level=logging.INFO,
         format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
     )
-    uvicorn.run(app, host="0.0.0.0", port=8080, log_level="info")
+    # Open /api/events streams never finish on their own; don't let them hold up shutdown
+    uvicorn.run(app, host="0.0.0.0", port=8080, log_level="info", timeout_graceful_shutdown=5)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,220 @@
+"""Tests for the TTS proxy's concurrency primitives and text splitting.
+
+Run with ``python -m unittest discover -s tests`` (or ``make test``).
+"""
+
+import asyncio
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from server import AdmissionQueue, QueueFullError, SingleFlight, join_text, split_text  # noqa: E402
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+class AdmissionQueueTest(unittest.IsolatedAsyncioTestCase):
+    async def test_admits_up_to_max_in_flight(self):
+        queue = AdmissionQueue(max_in_flight=2, max_queue=4)
+        await queue.acquire()
+        await queue.acquire()
+        waiter = asyncio.create_task(queue.acquire())
+        await _settle()
+        self.assertFalse(waiter.done())
+        self.assertEqual(queue.queued, 1)
+        queue.release()
+        await waiter
+        self.assertEqual(queue.in_flight, 2)
+        self.assertEqual(queue.queued, 0)
+
+    async def test_queue_full_fails_fast(self):
+        queue = AdmissionQueue(max_in_flight=1, max_queue=1)
+        await queue.acquire()
+        waiter = asyncio.create_task(queue.acquire())
+        await _settle()
+        with self.assertRaises(QueueFullError):
+            await queue.acquire()
+        self.assertEqual(queue.rejected, 1)
+        waiter.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiter
+
+    async def test_interactive_admitted_before_bulk(self):
+        queue = AdmissionQueue(max_in_flight=1, max_queue=4, bulk_share=0)
+        await queue.acquire()
+        order = []
+
+        async def wait(priority):
+            await queue.acquire(priority)
+            order.append(priority)
+
+        bulk = asyncio.create_task(wait("bulk"))
+        await _settle()
+        interactive = asyncio.create_task(wait("interactive"))
+        await _settle()
+        queue.release()
+        await interactive
+        queue.release()
+        await bulk
+        self.assertEqual(order, ["interactive", "bulk"])
+
+    async def test_cancelled_waiter_leaves_queue(self):
+        queue = AdmissionQueue(max_in_flight=1, max_queue=4)
+        await queue.acquire()
+        waiter = asyncio.create_task(queue.acquire())
+        await _settle()
+        waiter.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiter
+        self.assertEqual(queue.queued, 0)
+        queue.release()
+        self.assertEqual(queue.in_flight, 0)
+
+    async def test_cancelled_waiter_already_popped_by_release(self):
+        # release() runs between the cancellation and the waiter's except
+        # block, popping (and skipping) the cancelled future first.
+        queue = AdmissionQueue(max_in_flight=1, max_queue=4)
+        await queue.acquire()
+        waiter = asyncio.create_task(queue.acquire())
+        await _settle()
+        waiter.cancel()
+        queue.release()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiter
+        self.assertEqual(queue.in_flight, 0)
+        self.assertEqual(queue.queued, 0)
+
+    async def test_slot_handed_over_before_cancellation_is_passed_on(self):
+        queue = AdmissionQueue(max_in_flight=1, max_queue=4)
+        await queue.acquire()
+        first = asyncio.create_task(queue.acquire())
+        await _settle()
+        second = asyncio.create_task(queue.acquire())
+        await _settle()
+        queue.release()  # Hands the slot to ``first``...
+        first.cancel()  # ...which is cancelled before it resumes
+        with self.assertRaises(asyncio.CancelledError):
+            await first
+        await second
+        self.assertEqual(queue.in_flight, 1)
+        queue.release()
+        self.assertEqual(queue.in_flight, 0)
+
+    async def test_many_cancellations_do_not_leak_slots(self):
+        queue = AdmissionQueue(max_in_flight=2, max_queue=50)
+
+        async def hold():
+            async with queue.slot():
+                await asyncio.sleep(0.01)
+
+        tasks = [asyncio.create_task(hold()) for _ in range(40)]
+        await asyncio.sleep(0.015)
+        for task in tasks[::2]:
+            task.cancel()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        self.assertFalse([r for r in results if r is not None and not isinstance(r, asyncio.CancelledError)])
+        self.assertEqual(queue.in_flight, 0)
+        self.assertEqual(queue.queued, 0)
+
+
+class SingleFlightTest(unittest.IsolatedAsyncioTestCase):
+    async def test_concurrent_calls_share_one_execution(self):
+        flight = SingleFlight()
+        calls = 0
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "result"
+
+        results = await asyncio.gather(*(flight.do("k", work) for _ in range(3)))
+        self.assertEqual(calls, 1)
+        self.assertEqual([r for r, _ in results], ["result"] * 3)
+        self.assertEqual(sorted(shared for _, shared in results), [False, True, True])
+        self.assertEqual(flight.stats()["in_flight"], 0)
+
+    async def test_cancelled_waiter_does_not_cancel_shared_call(self):
+        flight = SingleFlight()
+        done = asyncio.Event()
+
+        async def work():
+            await done.wait()
+            return 1
+
+        first = asyncio.create_task(flight.do("k", work))
+        second = asyncio.create_task(flight.do("k", work))
+        await _settle()
+        first.cancel()
+        await _settle()
+        done.set()
+        self.assertEqual(await second, (1, True))
+        with self.assertRaises(asyncio.CancelledError):
+            await first
+
+    async def test_last_waiter_gone_cancels_call(self):
+        flight = SingleFlight()
+        started = asyncio.Event()
+        cancelled = asyncio.Event()
+
+        async def work():
+            started.set()
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        waiter = asyncio.create_task(flight.do("k", work))
+        await started.wait()
+        waiter.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiter
+        await _settle()
+        self.assertTrue(cancelled.is_set())
+        self.assertEqual(flight.stats()["in_flight"], 0)
+
+    async def test_errors_reach_every_waiter(self):
+        flight = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("boom")
+
+        results = await asyncio.gather(*(flight.do("k", work) for _ in range(2)), return_exceptions=True)
+        self.assertTrue(all(isinstance(r, RuntimeError) for r in results))
+
+
+class SplitTextTest(unittest.TestCase):
+    def test_short_text_is_one_chunk(self):
+        self.assertEqual(split_text("こんにちは。", 100), ["こんにちは。"])
+
+    def test_chunks_respect_max_chars(self):
+        text = "今日はいい天気ですね。散歩に行きましょう！" * 20 + "A very long English sentence, with clauses, goes here. " * 10
+        for max_chars in (5, 17, 50, 100):
+            chunks = split_text(text, max_chars)
+            self.assertTrue(all(0 < len(c) <= max_chars for c in chunks), max_chars)
+
+    def test_no_text_is_lost(self):
+        text = "First sentence. Second one! 日本語の文です。読点、あります。"
+        chunks = split_text(text, 12)
+        self.assertEqual("".join(chunks).replace(" ", ""), text.replace(" ", ""))
+        self.assertEqual(join_text(split_text("One. Two.", 5)), "One. Two.")
+
+    def test_splits_at_sentence_boundaries(self):
+        self.assertEqual(split_text("あいう。えお。", 4), ["あいう。", "えお。"])
+
+    def test_hard_cuts_unpunctuated_text(self):
+        self.assertEqual(split_text("a" * 10, 4), ["aaaa", "aaaa", "aa"])
+
+    def test_blank_text_has_no_chunks(self):
+        self.assertEqual(split_text("  \n ", 10), [])
+
+
+if __name__ == "__main__":
+    unittest.main()